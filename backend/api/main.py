@@ -4,10 +4,13 @@ from fastapi.middleware.cors import CORSMiddleware
 import json
 import os
 import re
-import pickle
+import sys
 from typing import List, Dict, Any
 from pydantic import BaseModel
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from incremental_processor import load_chunk_records
+
 app = FastAPI(title="NLP Analysis API", version="1.0.0")
 
 # CORS middleware for frontend connection
@@ -257,16 +260,13 @@ def load_enhanced_turns_any():
     return {}
 
 def load_processed_master() -> Dict[str, Any]:
-    """Load processed_data/master_transcripts.pkl if available."""
+    """Load the processed file records from processed_data, or {} if nothing has been processed."""
     base_dir = os.path.join(os.path.dirname(__file__), "../../processed_data")
-    pkl_path = os.path.join(base_dir, "master_transcripts.pkl")
-    if os.path.exists(pkl_path):
-        try:
-            with open(pkl_path, 'rb') as f:
-                return pickle.load(f)
-        except Exception:
-            return {}
-    return {}
+    try:
+        file_data, chunk_metadata = load_chunk_records(base_dir)
+    except FileNotFoundError:
+        return {}
+    return {'file_data': file_data, 'chunk_metadata': chunk_metadata}
 
 def load_word_repeats_json():
     candidates = [
@@ -1,27 +1,30 @@
 #!/usr/bin/env python3
 import json
-import pickle
 import os
+import sys
 from pathlib import Path
 from textblob import TextBlob
 from collections import defaultdict
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from incremental_processor import load_chunk_records
+
 class SentimentAnalyzer:
     def __init__(self, processed_data_dir="processed_data"):
         self.processed_data_dir = Path(processed_data_dir)
-        self.master_file = self.processed_data_dir / "master_transcripts.pkl"
         self.load_chunk_data()
     
     def load_chunk_data(self):
         """Load existing chunk data with embeddings"""
-        if self.master_file.exists():
-            with open(self.master_file, 'rb') as f:
-                self.master_data = pickle.load(f)
-            print(f"✅ Loaded {len(self.master_data.get('chunk_metadata', []))} chunks")
-        else:
+        try:
+            file_data, chunk_metadata = load_chunk_records(self.processed_data_dir)
+        except FileNotFoundError:
             print("❌ No processed data found. Run incremental processor first.")
             self.master_data = {'chunk_metadata': []}
+            return
+        self.master_data = {'file_data': file_data, 'chunk_metadata': chunk_metadata}
+        print(f"✅ Loaded {len(self.master_data.get('chunk_metadata', []))} chunks")
     
     def analyze_sentiment(self, text):
         """Analyze sentiment using TextBlob"""
@@ -1,19 +1,27 @@
 #!/usr/bin/env python3
 import json
 import os
-import pickle
+import sys
 from collections import defaultdict, Counter
 
+import faiss
 import numpy as np
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from incremental_processor import load_chunk_records
 
-def load_processed(path: str):
-    with open(path, 'rb') as f:
-        data = pickle.load(f)
-    embeddings = np.array(data['embeddings'])
-    chunk_metadata = data['chunk_metadata']
+
+def load_processed(processed_dir: str, index_path: str):
+    # One record per chunk, in the same order as the vectors in the index
+    _, chunk_metadata = load_chunk_records(processed_dir)
+    # Embeddings live only in the FAISS index written by the incremental processor
+    index = faiss.read_index(index_path)
+    if isinstance(index, faiss.IndexIDMap2):
+        # Chunk-id mapped index: read vectors positionally from the wrapped index
+        index = faiss.downcast_index(index.index)
+    embeddings = index.reconstruct_n(0, index.ntotal)
     return embeddings, chunk_metadata
 
 
@@ -152,8 +160,9 @@ def build_examples(labels, metas, topics, max_per_topic=50, max_switch_examples=
 
 
 def main():
-    processed_path = os.path.join(os.path.dirname(__file__), '../../processed_data/master_transcripts.pkl')
-    embeddings, chunk_metadata = load_processed(processed_path)
+    processed_dir = os.path.join(os.path.dirname(__file__), '../../processed_data')
+    index_path = os.path.join(processed_dir, 'faiss_index.bin')
+    embeddings, chunk_metadata = load_processed(processed_dir, index_path)
     texts, metas = extract_texts_and_meta(chunk_metadata)
 
     # Filter out empty texts to avoid degenerate TF-IDF rows
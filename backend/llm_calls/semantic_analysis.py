@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import json
 import os
-import pickle
+import sys
 import numpy as np
 import faiss
 from datetime import datetime
@@ -10,6 +10,9 @@ import re
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from incremental_processor import load_chunk_records
+
 # No need for API keys anymore!
 
 class SemanticAnalyzer:
@@ -123,14 +126,15 @@ class SemanticAnalyzer:
     def load_processed_data(self):
         """Load embeddings and chunk data"""
         try:
-            with open('../../processed_data/master_transcripts.pkl', 'rb') as f:
-                self.transcript_data = pickle.load(f)
-            
-            self.embeddings = self.transcript_data['embeddings']
-            self.chunk_metadata = self.transcript_data['chunk_metadata']
+            _, self.chunk_metadata = load_chunk_records('../../processed_data')
             
-            # Load FAISS index
+            # Load FAISS index (the only copy of the embeddings)
             self.index = faiss.read_index('../../processed_data/faiss_index.bin')
+            base_index = self.index
+            if isinstance(base_index, faiss.IndexIDMap2):
+                # Chunk-id mapped index: read vectors positionally from the wrapped index
+                base_index = faiss.downcast_index(base_index.index)
+            self.embeddings = base_index.reconstruct_n(0, base_index.ntotal)
             print(f"✅ Loaded {len(self.chunk_metadata)} chunks with embeddings")
             
         except Exception as e:
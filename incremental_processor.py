@@ -7,81 +7,359 @@ Adds new files to existing embeddings without reprocessing everything
 import os
 import re
 import pickle
-import json
+import orjson
+import zipfile
 import numpy as np
 import faiss
+import xxhash
+from lxml import etree
 from pathlib import Path
-from docx import Document
 from datetime import datetime
-from sentence_transformers import SentenceTransformer
+
+# torch and sentence_transformers are imported where the model is loaded, so
+# the backends can import load_chunk_records() without pulling them in
+
+# WordprocessingML namespace used in word/document.xml
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+WHITESPACE_RE = re.compile(r'\s+')
+SPEAKER_RE = re.compile(r'^([a-zA-Z0-9_]+)\s*:\s*')
+
+# CPU-only multi-process encoding: below this many chunks the worker start-up
+# cost outweighs the speedup; each worker is capped at a few torch threads so
+# the pool does not oversubscribe the cores
+MULTI_PROCESS_MIN_CHUNKS = 2000
+MAX_ENCODE_WORKERS = 4
+THREADS_PER_WORKER = 2
+
+def load_chunk_records(processed_data_dir="processed_data"):
+    """Read file_data.jsonl and expand it into one metadata record per chunk.
+    
+    Returns (file_data, chunk_metadata); chunk_metadata is in the same order
+    as the vectors in faiss_index.bin. A store the processor has not migrated
+    yet is read from the file records in its master file. Raises
+    FileNotFoundError if there are no file records at all.
+    """
+    processed_data_dir = Path(processed_data_dir)
+    records_path = processed_data_dir / "file_data.jsonl"
+    if records_path.exists():
+        with open(records_path, 'rb') as f:
+            file_data = [orjson.loads(line) for line in f if line.strip()]
+    else:
+        master_file = processed_data_dir / "master_transcripts.json"
+        legacy_master_file = processed_data_dir / "master_transcripts.pkl"
+        master_data = {}
+        if master_file.exists():
+            with open(master_file, 'rb') as f:
+                master_data = orjson.loads(f.read())
+        elif legacy_master_file.exists():
+            with open(legacy_master_file, 'rb') as f:
+                master_data = pickle.load(f)
+        if 'file_data' not in master_data:
+            raise FileNotFoundError(
+                f"No processed file records in {processed_data_dir}; run incremental_processor.py first"
+            )
+        file_data = master_data['file_data']
+    
+    chunk_metadata = [
+        {'file_metadata': fd['metadata'], 'chunk_index': i, 'chunk_text': text}
+        for fd in file_data for i, text in enumerate(fd['text_chunks'])
+    ]
+    return file_data, chunk_metadata
 
 class IncrementalProcessor:
-    def __init__(self, processed_data_dir="processed_data"):
+    # Shared by every instance so a long-running process loads the model once
+    _model_cache = None
+    
+    def __init__(self, processed_data_dir="processed_data", read_only=False):
         self.processed_data_dir = Path(processed_data_dir)
         self.processed_data_dir.mkdir(exist_ok=True)
         
-        self.master_file = self.processed_data_dir / "master_transcripts.pkl"
+        # Read-only instances mmap the FAISS index instead of copying it into RAM;
+        # they can search but not add new files
+        self.read_only = read_only
+        
+        self.master_file = self.processed_data_dir / "master_transcripts.json"
+        self.file_records = self.processed_data_dir / "file_data.jsonl"
+        self.legacy_master_file = self.processed_data_dir / "master_transcripts.pkl"
         self.faiss_file = self.processed_data_dir / "faiss_index.bin"
-        self.processed_files_log = self.processed_data_dir / "processed_files.json"
+        self.processed_files_log = self.processed_data_dir / "processed_files.jsonl"
+        self.legacy_processed_files_log = self.processed_data_dir / "processed_files.json"
         
         # Load existing data if available
         self.load_existing_data()
     
+    @property
+    def model(self):
+        """Lazily load the embedding model, once per process."""
+        if IncrementalProcessor._model_cache is None:
+            from sentence_transformers import SentenceTransformer
+            device = self._device()
+            model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+            if device == 'cuda':
+                # Warm up CUDA kernels so the first real batch doesn't pay for it
+                model.encode(["warm up"], show_progress_bar=False)
+            IncrementalProcessor._model_cache = model
+        return IncrementalProcessor._model_cache
+    
+    def _device(self):
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    
     def load_existing_data(self):
         """Load existing processed data or initialize empty structures."""
-        if self.master_file.exists():
+        # File records and log entries waiting to be appended by save_data(),
+        # and whether either file has to be rewritten in full instead
+        self._pending_records = []
+        self._pending_log = []
+        self._rewrite_records = False
+        self._rewrite_log = False
+        
+        if self.master_file.exists() or self.legacy_master_file.exists():
             print("Loading existing processed data...")
-            with open(self.master_file, 'rb') as f:
-                self.master_data = pickle.load(f)
+            legacy_embeddings = None
+            if self.master_file.exists():
+                with open(self.master_file, 'rb') as f:
+                    self.master_data = orjson.loads(f.read())
+            else:
+                # One-time migration from the old pickle format; the next
+                # save_data() writes the JSON sidecar instead
+                with open(self.legacy_master_file, 'rb') as f:
+                    self.master_data = pickle.load(f)
+                # Older master files carried a duplicate copy of the vectors;
+                # the FAISS index is now the only embedding store
+                legacy_embeddings = self.master_data.pop('embeddings', None)
+            
+            if 'file_data' in self.master_data:
+                # Older master files held every file record; the next
+                # save_data() moves them to file_data.jsonl
+                self._rewrite_records = True
+            else:
+                self.master_data['file_data'] = self.read_jsonl(self.file_records)
+            self.master_data['chunk_metadata'] = self.build_chunk_columns(self.master_data['file_data'])
             
             # Load FAISS index
             if self.faiss_file.exists():
-                self.faiss_index = faiss.read_index(str(self.faiss_file))
+                if self.read_only:
+                    io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                    self.faiss_index = faiss.read_index(str(self.faiss_file), io_flags)
+                else:
+                    self.faiss_index = faiss.read_index(str(self.faiss_file))
+                if not isinstance(self.faiss_index, faiss.IndexIDMap2):
+                    # Indexes written before chunk ids were introduced
+                    self.faiss_index = self.add_chunk_ids(self.faiss_index)
+            else:
+                chunk_text = self.master_data['chunk_metadata']['chunk_text']
+                if legacy_embeddings is None and chunk_text:
+                    # Only the old pickle kept a copy of the vectors, so a
+                    # missing index is rebuilt from the stored chunk texts
+                    print(f"{self.faiss_file} is missing; re-encoding {len(chunk_text)} stored chunks...")
+                    legacy_embeddings = self.encode_chunks(self.model, chunk_text)
+                
+                if legacy_embeddings is None:
+                    self.faiss_index = self.create_index(self.master_data.get('embedding_dimension', 384))
+                else:
+                    # Rebuild FAISS index from embeddings
+                    embeddings = np.ascontiguousarray(legacy_embeddings, dtype=np.float32)
+                    faiss.normalize_L2(embeddings)
+                    self.faiss_index = self.add_chunk_ids(embeddings)
+            
+            # Summary sets are persisted with the master data; older files
+            # without them are scanned once here
+            if 'participants' in self.master_data and 'session_types' in self.master_data:
+                self._participants = set(self.master_data['participants'])
+                self._session_types = set(self.master_data['session_types'])
             else:
-                # Rebuild FAISS index from embeddings
-                embeddings = self.master_data['embeddings']
-                dimension = embeddings.shape[1]
-                self.faiss_index = faiss.IndexFlatIP(dimension)
-                faiss.normalize_L2(embeddings)
-                self.faiss_index.add(embeddings.astype(np.float32))
+                self._participants = set()
+                self._session_types = set()
+                for fd in self.master_data['file_data']:
+                    self._participants.add(fd['metadata']['participant_id'])
+                    self._session_types.add(fd['metadata']['session_type'])
             
-            # Load processed files log
+            # Load processed files log: content hash -> every path holding
+            # that content, so byte-identical copies share one entry
             if self.processed_files_log.exists():
-                with open(self.processed_files_log, 'r') as f:
-                    self.processed_files = set(json.load(f))
+                self.processed_files = {}
+                for entry in self.read_jsonl(self.processed_files_log):
+                    self.processed_files.setdefault(entry['hash'], set()).add(entry['path'])
+            elif self.legacy_processed_files_log.exists():
+                with open(self.legacy_processed_files_log, 'rb') as f:
+                    logged = orjson.loads(f.read())
+                if isinstance(logged, dict):
+                    self.processed_files = {file_hash: {path} for file_hash, path in logged.items()}
+                else:
+                    # Older logs were a plain list of paths
+                    self.processed_files = self.hash_existing_files(logged)
+                self._rewrite_log = True
             else:
                 # Extract from existing data
-                self.processed_files = set()
-                for chunk_meta in self.master_data.get('chunk_metadata', []):
-                    self.processed_files.add(chunk_meta['file_metadata']['file_path'])
+                self.processed_files = self.hash_existing_files(
+                    fd['metadata']['file_path'] for fd in self.master_data['file_data']
+                )
+                self._rewrite_log = True
+            self._processed_paths = {
+                path: file_hash
+                for file_hash, paths in self.processed_files.items()
+                for path in paths
+            }
             
-            print(f"Loaded {len(self.master_data.get('chunk_metadata', []))} existing chunks from {len(self.processed_files)} files")
+            print(f"Loaded {len(self.master_data['chunk_metadata']['chunk_id'])} existing chunks from {len(self.processed_files)} files")
         else:
             print("No existing data found. Starting fresh...")
             self.master_data = {
-                'embeddings': np.array([]).reshape(0, 384),  # Empty array with correct shape
-                'chunk_metadata': [],
+                'chunk_metadata': self.build_chunk_columns([]),
                 'file_data': [],
                 'processing_timestamp': datetime.now().isoformat(),
                 'embedding_model': 'all-MiniLM-L6-v2',
                 'embedding_dimension': 384
             }
-            self.faiss_index = faiss.IndexFlatIP(384)
-            self.processed_files = set()
+            self.faiss_index = self.create_index(384)
+            self.processed_files = {}
+            self._processed_paths = {}
+            self._participants = set()
+            self._session_types = set()
+    
+    def read_jsonl(self, path):
+        """Read a JSON Lines file into a list, or [] if it does not exist."""
+        if not path.exists():
+            return []
+        with open(path, 'rb') as f:
+            return [orjson.loads(line) for line in f if line.strip()]
+    
+    def write_jsonl(self, path, entries, mode='a'):
+        """Append entries to a JSON Lines file (or overwrite with mode='w')."""
+        with open(path, mode + 'b') as f:
+            for entry in entries:
+                f.write(orjson.dumps(entry) + b'\n')
+    
+    def build_chunk_columns(self, file_data):
+        """Return chunk metadata as one column per attribute.
+        
+        Row i describes vector i in the FAISS index: file_idx points into
+        file_data, so the file metadata is not repeated per chunk.
+        """
+        chunk_counts = [fd['chunk_count'] for fd in file_data]
+        return {
+            'file_idx': np.repeat(np.arange(len(file_data), dtype=np.int32), chunk_counts),
+            'chunk_index': np.array(
+                [i for count in chunk_counts for i in range(count)], dtype=np.int32
+            ),
+            # Records written before chunk ids existed get theirs from add_chunk_ids()
+            'chunk_id': np.array(
+                [cid for fd in file_data for cid in fd.get('chunk_ids', [0] * fd['chunk_count'])],
+                dtype=np.int64
+            ),
+            'chunk_text': [text for fd in file_data for text in fd['text_chunks']]
+        }
+    
+    def hash_file(self, file_path):
+        """Return the xxh3-128 content hash of a file, read in 64 KB blocks."""
+        hasher = xxhash.xxh3_128()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+    
+    def hash_existing_files(self, file_paths):
+        """Build a hash -> paths log for already-processed files that are still on disk."""
+        processed = {}
+        for file_path in file_paths:
+            if os.path.exists(file_path):
+                processed.setdefault(self.hash_file(file_path), set()).add(file_path)
+        return processed
+    
+    def create_index(self, dimension):
+        """Create an empty id-mapped index with 8-bit scalar-quantized storage.
+        
+        The embeddings are unit-normalized, so every component lies in [-1, 1];
+        the quantizer is trained on those fixed bounds rather than on whatever
+        batch is added first. Cosine scores stay within ~0.002 of the fp32
+        flat index at a quarter of the memory.
+        """
+        quantized = faiss.IndexScalarQuantizer(
+            dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        bounds = np.array([[-1.0] * dimension, [1.0] * dimension], dtype=np.float32)
+        quantized.train(bounds)
+        return faiss.IndexIDMap2(quantized)
+    
+    def chunk_id(self, file_key, chunk_index):
+        """Return the stable 63-bit FAISS id of one chunk of a file.
+        
+        New files are keyed by content hash, so a file keeps its ids when it
+        moves and a new file at its old path cannot collide with them.
+        """
+        return xxhash.xxh3_64_intdigest(f"{file_key}:{chunk_index}".encode()) & ((1 << 63) - 1)
+    
+    def add_chunk_ids(self, vectors):
+        """Build an id-mapped index from an older position-only index or raw vectors.
+        
+        Records that already carry chunk ids keep them; older records get ids
+        derived from their path, written back to the chunk metadata.
+        """
+        if isinstance(vectors, faiss.Index):
+            vectors = vectors.reconstruct_n(0, vectors.ntotal)
+        
+        file_data = self.master_data['file_data']
+        for fd in file_data:
+            if 'chunk_ids' not in fd:
+                file_path = fd['metadata']['file_path']
+                fd['chunk_ids'] = [self.chunk_id(file_path, i) for i in range(fd['chunk_count'])]
+                self._rewrite_records = True
+        
+        chunk_columns = self.master_data['chunk_metadata']
+        ids = np.array([
+            file_data[file_idx]['chunk_ids'][chunk_index]
+            for file_idx, chunk_index in zip(chunk_columns['file_idx'], chunk_columns['chunk_index'])
+        ], dtype=np.int64)
+        chunk_columns['chunk_id'] = ids
+        
+        index = self.create_index(vectors.shape[1])
+        index.add_with_ids(vectors, ids)
+        return index
+    
+    def get_embeddings(self):
+        """Reconstruct the stored embedding matrix from the FAISS index."""
+        # IndexIDMap2.reconstruct_n is keyed by chunk id, so read the
+        # positional vectors from the wrapped index instead
+        base_index = faiss.downcast_index(self.faiss_index.index)
+        if base_index.ntotal == 0:
+            return np.empty((0, base_index.d), dtype=np.float32)
+        return base_index.reconstruct_n(0, base_index.ntotal)
     
     def extract_docx_content(self, file_path):
-        """Extract clean text content from DOCX file."""
+        """Extract clean text content from DOCX file.
+        
+        Streams word/document.xml instead of building the python-docx object
+        model. Like Document.paragraphs, only top-level body paragraphs are
+        read; table contents are skipped.
+        """
         try:
-            doc = Document(file_path)
             content = []
+            body_tag = W_NS + 'body'
+            text_tags = (W_NS + 't', W_NS + 'tab', W_NS + 'br', W_NS + 'cr')
             
-            for paragraph in doc.paragraphs:
-                text = paragraph.text.strip()
-                if text:
-                    # Clean text
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    text = re.sub(r'^([a-zA-Z0-9_]+)\s*:\s*', r'\1: ', text)
-                    content.append(text)
+            with zipfile.ZipFile(file_path) as docx, docx.open('word/document.xml') as xml:
+                for _, element in etree.iterparse(xml, tag=(W_NS + 'p', W_NS + 'tbl')):
+                    parent = element.getparent()
+                    if parent is None or parent.tag != body_tag:
+                        # Paragraph inside a table; freed with its table
+                        continue
+                    
+                    if element.tag == W_NS + 'p':
+                        text = ''.join(
+                            (node.text or '') if node.tag == W_NS + 't' else ' '
+                            for node in element.iter(*text_tags)
+                        ).strip()
+                        if text:
+                            # Clean text
+                            text = WHITESPACE_RE.sub(' ', text)
+                            text = SPEAKER_RE.sub(r'\1: ', text)
+                            content.append(text)
+                    
+                    # Drop parsed body elements to keep memory flat
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
             
             return content
         except Exception as e:
@@ -118,42 +396,109 @@ class IncrementalProcessor:
         }
     
     def find_new_files(self, data_dir):
-        """Find files that haven't been processed yet."""
+        """Find files that haven't been processed yet.
+        
+        Known paths are skipped without reading them. Unknown paths are
+        hashed, so a renamed or moved transcript is matched by content and
+        not embedded a second time.
+        """
         all_files = []
         new_files = []
+        self._pending_hashes = {}
+        # Content hash of each new file -> further new paths with the same bytes
+        self._pending_copies = {}
+        self._changed_paths = 0
         
-        for participant_dir in Path(data_dir).iterdir():
-            if not participant_dir.is_dir():
-                continue
-                
-            for session_dir in participant_dir.iterdir():
-                if not session_dir.is_dir():
+        # os.scandir yields DirEntry objects with cached type info, so the
+        # walk costs one directory read per level instead of a stat per entry
+        with os.scandir(data_dir) as participant_dirs:
+            for participant_dir in participant_dirs:
+                if not participant_dir.is_dir():
                     continue
-                    
-                for file_path in session_dir.glob("*.docx"):
-                    all_files.append(file_path)
-                    if str(file_path) not in self.processed_files:
-                        new_files.append(file_path)
+                
+                with os.scandir(participant_dir.path) as session_dirs:
+                    for session_dir in session_dirs:
+                        if not session_dir.is_dir():
+                            continue
+                        
+                        with os.scandir(session_dir.path) as entries:
+                            for entry in entries:
+                                if not entry.name.endswith('.docx') or not entry.is_file():
+                                    continue
+                                all_files.append(entry.path)
+                                if entry.path in self._processed_paths:
+                                    continue
+                                
+                                file_hash = self.hash_file(entry.path)
+                                if file_hash in self.processed_files:
+                                    self.record_known_path(file_hash, entry.path)
+                                    self._changed_paths += 1
+                                elif file_hash in self._pending_copies:
+                                    print(f"Same content as another new file: {entry.path}")
+                                    self._pending_copies[file_hash].append(entry.path)
+                                else:
+                                    self._pending_copies[file_hash] = []
+                                    self._pending_hashes[entry.path] = file_hash
+                                    new_files.append(entry.path)
         
         return all_files, new_files
     
+    def record_known_path(self, file_hash, file_path):
+        """Record a new path for content that is already embedded.
+        
+        Earlier paths that still exist are kept, so a copy does not evict the
+        original. Paths that are gone were moved; they are dropped and the
+        file record is pointed at the new path.
+        """
+        known_paths = self.processed_files[file_hash]
+        moved_from = {path for path in known_paths if not os.path.exists(path)}
+        
+        self.processed_files[file_hash] = (known_paths - moved_from) | {file_path}
+        self._processed_paths[file_path] = file_hash
+        for path in moved_from:
+            del self._processed_paths[path]
+        
+        if not moved_from:
+            print(f"Copy of an already processed file: {file_path}")
+            self._pending_log.append({
+                'hash': file_hash,
+                'path': file_path,
+                'ts': datetime.now().isoformat()
+            })
+            return
+        
+        print(f"Already processed under a different path: {file_path}")
+        file_data = self.master_data['file_data']
+        for fd in file_data:
+            if fd['metadata']['file_path'] in moved_from:
+                fd['metadata'] = self.parse_file_metadata(file_path)
+        
+        # Moves are rare, so both JSONL files are compacted on the next save
+        self._rewrite_records = True
+        self._rewrite_log = True
+        self._participants = {fd['metadata']['participant_id'] for fd in file_data}
+        self._session_types = {fd['metadata']['session_type'] for fd in file_data}
+    
     def process_new_files(self, new_files):
         """Process only new files and add to existing data."""
         if not new_files:
             print("No new files to process!")
             return
         
-        print(f"Processing {len(new_files)} new files...")
+        if self.read_only:
+            raise RuntimeError("Cannot add files to a read-only IncrementalProcessor")
         
-        # Load model
-        model = SentenceTransformer('all-MiniLM-L6-v2')
+        print(f"Processing {len(new_files)} new files...")
         
         new_chunks = []
-        new_chunk_metadata = []
+        new_chunk_ids = []
+        new_file_idx = []
+        new_chunk_index = []
         new_file_data = []
+        first_file_idx = len(self.master_data['file_data'])
         
         for file_path in new_files:
-            print(f"Processing: {file_path.name}")
+            print(f"Processing: {os.path.basename(file_path)}")
             
             # Extract content and metadata
             text_content = self.extract_docx_content(file_path)
@@ -161,26 +506,35 @@ class IncrementalProcessor:
             
             if text_content:
                 # Store file data
+                file_hash = self._pending_hashes[file_path]
+                chunk_ids = [self.chunk_id(file_hash, i) for i in range(len(text_content))]
                 file_data = {
                     'metadata': metadata,
                     'text_chunks': text_content,
-                    'chunk_count': len(text_content)
+                    'chunk_count': len(text_content),
+                    'chunk_ids': chunk_ids
                 }
+                file_idx = first_file_idx + len(new_file_data)
                 new_file_data.append(file_data)
+                self._participants.add(metadata['participant_id'])
+                self._session_types.add(metadata['session_type'])
                 
                 # Prepare chunks for embedding
-                for i, chunk in enumerate(text_content):
-                    new_chunks.append(chunk)
-                    
-                    chunk_meta = {
-                        'file_metadata': metadata,
-                        'chunk_index': i,
-                        'chunk_text': chunk
-                    }
-                    new_chunk_metadata.append(chunk_meta)
+                chunk_count = len(text_content)
+                new_chunks.extend(text_content)
+                new_chunk_ids.extend(chunk_ids)
+                new_file_idx.extend([file_idx] * chunk_count)
+                new_chunk_index.extend(range(chunk_count))
                 
-                # Mark as processed
-                self.processed_files.add(str(file_path))
+                # Mark as processed, along with any copies found in the same scan
+                for path in [file_path] + self._pending_copies.get(file_hash, []):
+                    self.processed_files.setdefault(file_hash, set()).add(path)
+                    self._processed_paths[path] = file_hash
+                    self._pending_log.append({
+                        'hash': file_hash,
+                        'path': path,
+                        'ts': datetime.now().isoformat()
+                    })
         
         if not new_chunks:
             print("No valid content found in new files!")
@@ -189,63 +543,185 @@ class IncrementalProcessor:
         print(f"Creating embeddings for {len(new_chunks)} new chunks...")
         
         # Create embeddings for new chunks
-        new_embeddings = model.encode(new_chunks, show_progress_bar=True)
+        new_embeddings = self.encode_chunks(self.model, new_chunks)
+        new_embeddings = new_embeddings.astype(np.float32, copy=False)
         
-        # Normalize for cosine similarity
-        faiss.normalize_L2(new_embeddings)
-        
-        # Add to existing data
-        if len(self.master_data['embeddings']) == 0:
-            # First time - initialize arrays
-            self.master_data['embeddings'] = new_embeddings
-        else:
-            # Append to existing embeddings
-            self.master_data['embeddings'] = np.vstack([
-                self.master_data['embeddings'], 
-                new_embeddings
-            ])
-        
-        # Add to FAISS index
-        self.faiss_index.add(new_embeddings.astype(np.float32))
+        # Add to FAISS index (the index owns the embeddings, so there is no
+        # separate matrix to grow here)
+        self.faiss_index.add_with_ids(new_embeddings, np.array(new_chunk_ids, dtype=np.int64))
         
         # Update metadata
-        self.master_data['chunk_metadata'].extend(new_chunk_metadata)
+        chunk_columns = self.master_data['chunk_metadata']
+        chunk_columns['file_idx'] = np.concatenate(
+            [chunk_columns['file_idx'], np.array(new_file_idx, dtype=np.int32)]
+        )
+        chunk_columns['chunk_index'] = np.concatenate(
+            [chunk_columns['chunk_index'], np.array(new_chunk_index, dtype=np.int32)]
+        )
+        chunk_columns['chunk_id'] = np.concatenate(
+            [chunk_columns['chunk_id'], np.array(new_chunk_ids, dtype=np.int64)]
+        )
+        chunk_columns['chunk_text'].extend(new_chunks)
         self.master_data['file_data'].extend(new_file_data)
+        self._pending_records.extend(new_file_data)
         self.master_data['total_files'] = len(self.master_data['file_data'])
-        self.master_data['total_chunks'] = len(self.master_data['chunk_metadata'])
+        self.master_data['total_chunks'] = len(chunk_columns['chunk_id'])
         self.master_data['last_update'] = datetime.now().isoformat()
         
         print(f"Added {len(new_chunks)} chunks from {len(new_files)} files")
     
+    def encode_chunks(self, model, chunks):
+        """Embed chunks, L2-normalized inside the model so inner product is cosine similarity.
+        
+        Without CUDA, large batches are spread over a pool of CPU processes to
+        get past the GIL and torch's intra-op thread ceiling.
+        """
+        cpu_workers = min(MAX_ENCODE_WORKERS, (os.cpu_count() or 1) // THREADS_PER_WORKER)
+        if self._device() == 'cuda' or cpu_workers < 2 or len(chunks) < MULTI_PROCESS_MIN_CHUNKS:
+            return model.encode(
+                chunks,
+                batch_size=128,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=True
+            )
+        
+        print(f"Encoding on {cpu_workers} CPU worker processes...")
+        
+        # Workers are spawned fresh, so the thread cap has to be in their environment
+        previous_threads = os.environ.get('OMP_NUM_THREADS')
+        os.environ['OMP_NUM_THREADS'] = str(THREADS_PER_WORKER)
+        try:
+            pool = model.start_multi_process_pool(['cpu'] * cpu_workers)
+        finally:
+            if previous_threads is None:
+                del os.environ['OMP_NUM_THREADS']
+            else:
+                os.environ['OMP_NUM_THREADS'] = previous_threads
+        
+        try:
+            return model.encode_multi_process(chunks, pool, batch_size=32, normalize_embeddings=True)
+        finally:
+            model.stop_multi_process_pool(pool)
+    
+    def remove_file(self, file_path):
+        """Remove a processed file and its vectors without rebuilding the index.
+        
+        The path is resolved through its content hash, so the record is found
+        under whichever path it was first stored. If byte-identical copies
+        remain at other paths, only this path is forgotten and the vectors stay.
+        """
+        if self.read_only:
+            raise RuntimeError("Cannot remove files from a read-only IncrementalProcessor")
+        
+        file_path = str(file_path)
+        file_hash = self._processed_paths.get(file_path)
+        paths = self.processed_files.get(file_hash, {file_path})
+        file_data = self.master_data['file_data']
+        positions = [i for i, fd in enumerate(file_data) if fd['metadata']['file_path'] in paths]
+        if not positions:
+            print(f"Not in processed data: {file_path}")
+            return False
+        
+        # Removal is rare, so compacting both JSONL files on the next save is fine
+        self._rewrite_records = True
+        self._rewrite_log = True
+        
+        if len(paths) > 1:
+            paths.discard(file_path)
+            del self._processed_paths[file_path]
+            record = file_data[positions[0]]
+            if record['metadata']['file_path'] == file_path:
+                record['metadata'] = self.parse_file_metadata(min(paths))
+            self._participants = {fd['metadata']['participant_id'] for fd in file_data}
+            self._session_types = {fd['metadata']['session_type'] for fd in file_data}
+            print(f"Forgot {os.path.basename(file_path)}; its content is still processed at {len(paths)} other path(s)")
+            return True
+        
+        removed = file_data.pop(positions[0])
+        ids = np.array(removed['chunk_ids'], dtype=np.int64)
+        self.faiss_index.remove_ids(faiss.IDSelectorArray(ids))
+        
+        chunk_columns = self.master_data['chunk_metadata']
+        keep = chunk_columns['file_idx'] != positions[0]
+        chunk_columns['chunk_text'] = [
+            text for text, kept in zip(chunk_columns['chunk_text'], keep) if kept
+        ]
+        for column in ('file_idx', 'chunk_index', 'chunk_id'):
+            chunk_columns[column] = chunk_columns[column][keep]
+        # Later files moved down one slot in file_data
+        chunk_columns['file_idx'][chunk_columns['file_idx'] > positions[0]] -= 1
+        
+        if file_hash is not None:
+            del self.processed_files[file_hash]
+            del self._processed_paths[file_path]
+        self._participants = {fd['metadata']['participant_id'] for fd in file_data}
+        self._session_types = {fd['metadata']['session_type'] for fd in file_data}
+        
+        self.master_data['total_files'] = len(file_data)
+        self.master_data['total_chunks'] = len(chunk_columns['chunk_id'])
+        self.master_data['last_update'] = datetime.now().isoformat()
+        
+        print(f"Removed {len(ids)} chunks from {os.path.basename(file_path)}")
+        return True
+    
     def save_data(self):
         """Save updated data to files."""
         print("Saving updated data...")
         
-        # Save master data
+        if self.read_only:
+            raise RuntimeError("Cannot save data from a read-only IncrementalProcessor")
+        
+        self.master_data['participants'] = sorted(self._participants)
+        self.master_data['session_types'] = sorted(self._session_types)
+        
+        # Save master data header; file records go to file_data.jsonl, chunk
+        # metadata is rebuilt from them on load and the vectors live in the
+        # FAISS index
+        header = {
+            key: value for key, value in self.master_data.items()
+            if key not in ('file_data', 'chunk_metadata')
+        }
         with open(self.master_file, 'wb') as f:
-            pickle.dump(self.master_data, f)
+            f.write(orjson.dumps(header, option=orjson.OPT_INDENT_2))
+        
+        # File records and the processed files log are append-only; only a
+        # format migration or remove_file() rewrites them in full
+        if self._rewrite_records:
+            self.write_jsonl(self.file_records, self.master_data['file_data'], mode='w')
+        else:
+            self.write_jsonl(self.file_records, self._pending_records)
+        
+        if self._rewrite_log:
+            timestamp = datetime.now().isoformat()
+            self.write_jsonl(self.processed_files_log, (
+                {'hash': file_hash, 'path': path, 'ts': timestamp}
+                for file_hash, paths in self.processed_files.items()
+                for path in sorted(paths)
+            ), mode='w')
+        else:
+            self.write_jsonl(self.processed_files_log, self._pending_log)
+        
+        self._pending_records = []
+        self._pending_log = []
+        self._rewrite_records = False
+        self._rewrite_log = False
         
         # Save FAISS index
         faiss.write_index(self.faiss_index, str(self.faiss_file))
         
-        # Save processed files log
-        with open(self.processed_files_log, 'w') as f:
-            json.dump(list(self.processed_files), f, indent=2)
-        
         # Save summary
         summary = {
             'total_files': self.master_data.get('total_files', 0),
             'total_chunks': self.master_data.get('total_chunks', 0),
-            'participants': list(set(fd['metadata']['participant_id'] 
-                                   for fd in self.master_data['file_data'])),
-            'session_types': list(set(fd['metadata']['session_type'] 
-                                    for fd in self.master_data['file_data'])),
+            'participants': self.master_data['participants'],
+            'session_types': self.master_data['session_types'],
             'last_update': self.master_data.get('last_update', 'unknown')
         }
         
         summary_file = self.processed_data_dir / "processing_summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        with open(summary_file, 'wb') as f:
+            f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
         
         print(f"Data saved. Total: {summary['total_files']} files, {summary['total_chunks']} chunks")
     
@@ -264,7 +740,7 @@ class IncrementalProcessor:
         all_files, new_files = self.find_new_files(data_dir)
         
         print(f"Found {len(all_files)} total files")
-        print(f"Already processed: {len(self.processed_files)} files")
+        print(f"Already processed: {len(self._processed_paths)} files")
         print(f"New files to process: {len(new_files)} files")
         
         if new_files:
@@ -285,6 +761,11 @@ class IncrementalProcessor:
             print(f"Total chunks: {self.master_data.get('total_chunks', 0)}")
             print(f"Processing time: {duration}")
         else:
+            if (self._changed_paths or self._rewrite_records or self._rewrite_log
+                    or not self.faiss_file.exists()):
+                # Record the paths of moved and copied files, and finish any
+                # format migration or index rebuild done while loading
+                self.save_data()
             print("\n✅ No new files to process. System is up to date!")
 
 def main():
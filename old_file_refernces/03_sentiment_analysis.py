@@ -1,6 +1,8 @@
+import os
 import streamlit as st
 import pandas as pd
-import json
+import orjson
+import ijson
 import plotly.express as px
 import numpy as np
 import plotly.graph_objects as go
@@ -10,136 +12,269 @@ CLASSIFIED_PATH = "classified_output_1.json"
 ENRICHED_PATH = "transcript_insights_updated.json"
 ENHANCED_ANALYSIS_PATH = "enhanced_analysis.json"
 
+# Parsed sentiment frame, reused across restarts until either source JSON changes;
+# bump the version whenever _parse_sentiment_data() changes the frame it returns
+SENTIMENT_CACHE_VERSION = 2
+SENTIMENT_CACHE_PATH = f".sentiment_cache.v{SENTIMENT_CACHE_VERSION}.parquet"
+
 @st.cache_data
 def load_json(path):
-    with open(path, encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+def _example_text(ex):
+    """Return the display text of one sentiment example, or "" if it has none."""
+    if isinstance(ex, str):
+        return ex
+    if isinstance(ex, dict):
+        if 'text' in ex and isinstance(ex['text'], str):
+            return ex['text']
+        if 'context' in ex and isinstance(ex['context'], str):
+            return ex['context']
+    return ""
+
+def _build_sentiment_index(path):
+    """Map (patient_id, filename) to that file's "Sentiment Analysis" dict.
+    
+    Streams the enriched JSON one participant at a time instead of loading it whole.
+    If a file appears under several session categories the first one wins.
+    """
+    index = {}
+    with open(path, "rb") as f:
+        for patient_id, categories in ijson.kvitems(f, "", use_float=True):
+            for files in categories.values():
+                for filename, file_data in files.items():
+                    sentiment_data = file_data.get("Sentiment Analysis")
+                    if sentiment_data and (patient_id, filename) not in index:
+                        index[(patient_id, filename)] = sentiment_data
+    return index
+
+def _non_final_classified_df(classified):
+    """Return one row per classified file, leaving out Final Interview files.
+    
+    Object dtype keeps the raw JSON values (e.g. week None instead of NaN).
+    """
+    cls_df = pd.DataFrame(classified, dtype=object)
+    for col in ("patient_id", "session_type", "week", "filename", "condition_value", "final_interview"):
+        if col not in cls_df:
+            cls_df[col] = None
+    cls_df = cls_df.astype(object).where(cls_df.notna(), None)
+    is_final = cls_df["final_interview"].fillna(False).astype(bool) | (cls_df["session_type"] == "Final Interview")
+    return cls_df[~is_final]
+
+def _filter_options(cls_df):
+    """Return the sorted participant, session type and condition filter options."""
+    patients = cls_df["patient_id"]
+    sessions = cls_df["session_type"]
+    conditions = cls_df["condition_value"]
+    return (
+        sorted(patients[patients.astype(bool)].unique()),
+        sorted(sessions[sessions.astype(bool)].unique()),
+        sorted(conditions[conditions.astype(bool)].str.strip().unique()),
+    )
+
+@st.cache_data
+def load_sentiment_data():
+    """Return the unfiltered sentiment frame and the (patients, sessions, conditions) filter options.
+    
+    Cached so the JSON is only parsed once; build_sentiment_dataframe() filters the frame.
+    The frame is also written to SENTIMENT_CACHE_PATH as parquet, with the filter options
+    in its attrs, so a restart skips the JSON parsing unless classified or enriched
+    data is newer than the cache file.
+    """
+    source_mtime = max(os.path.getmtime(path) for path in (CLASSIFIED_PATH, ENRICHED_PATH))
+    if os.path.exists(SENTIMENT_CACHE_PATH) and os.path.getmtime(SENTIMENT_CACHE_PATH) >= source_mtime:
+        df = pd.read_parquet(SENTIMENT_CACHE_PATH)
+        return df, tuple(df.attrs["filter_options"])
+    
+    df, filter_options = _parse_sentiment_data()
+    df.attrs["filter_options"] = filter_options
+    df.to_parquet(SENTIMENT_CACHE_PATH, index=False)
+    return df, filter_options
 
-def build_sentiment_dataframe(selected_patients, selected_sessions, selected_conditions):
+def _parse_sentiment_data():
+    """Build the unfiltered sentiment frame and filter options from the classified and enriched JSON."""
     # Load data
     classified = load_json(CLASSIFIED_PATH)
-    enriched = load_json(ENRICHED_PATH)
     
-    # Initialize data structures
-    sentiment_rows = []
+    if not classified:
+        return pd.DataFrame(), ([], [], [])
+    
+    # One row per classified file, skipping Final Interview files
+    cls_df = _non_final_classified_df(classified)
+    filter_options = _filter_options(cls_df)
+    cls_df["condition_value"] = cls_df["condition_value"].fillna("").str.strip()
+    
+    # One row per (patient, file) with sentiment data
+    sentiment_index = _build_sentiment_index(ENRICHED_PATH)
+    sentiment_df = pd.DataFrame(
+        [(patient_id, filename, sentiment) for (patient_id, filename), sentiment in sentiment_index.items()],
+        columns=["patient_id", "filename", "sentiment"]
+    )
+    counts = pd.json_normalize(sentiment_df["sentiment"].map(lambda sa: sa.get("sentiment_counts") or {}).tolist())
+    counts.index = sentiment_df.index
+    
+    # Files without sentiment data are dropped by the inner join
+    merged = cls_df.merge(
+        sentiment_df.join(counts), on=["patient_id", "filename"], how="inner"
+    )
+    
+    # Counts that are missing or not numeric count as 0; int32 halves the column size.
+    # Week is float, NaN for files without a numeric week (shown as Final); fractional
+    # weeks such as "1.5" are kept as they are
+    df = pd.DataFrame({
+        "Patient ID": merged["patient_id"],
+        "Session Type": merged["session_type"],
+        "Week": pd.to_numeric(merged["week"], errors="coerce").astype("float64"),
+    })
+    for col in ("Positive", "Negative", "Neutral"):
+        key = col.lower()
+        values = merged[key] if key in merged else pd.Series(0, index=merged.index)
+        df[col] = pd.to_numeric(values, errors="coerce").fillna(0).astype("int32")
+    df["Total"] = df[["Positive", "Negative", "Neutral"]].sum(axis=1)
+    df["Net Score"] = df["Positive"] - df["Negative"]
+    df["Filename"] = merged["filename"]
+    df["Condition"] = merged["condition_value"]
+    
+    # Example texts per file: normalise to lists, explode, extract and regroup
+    examples = merged["sentiment"].map(lambda sa: sa.get("examples", []))
+    examples = examples.map(lambda ex: ex if isinstance(ex, list) else ([ex] if ex else []))
+    texts = examples.explode().map(_example_text)
+    texts = texts[texts != ""].groupby(level=0).agg(list).reindex(df.index)
+    df["Examples"] = [value if isinstance(value, list) else [] for value in texts]
+    
+    # Repeated strings as categories: smaller frame and faster filters/groupbys
+    for col in ("Patient ID", "Session Type", "Condition", "Filename"):
+        df[col] = df[col].astype("category")
+    return df, filter_options
+
+def build_sentiment_dataframe(full_df, selected_patients, selected_sessions, selected_conditions):
+    if full_df.empty:
+        return full_df, {}
+    
+    # Apply filters (an empty selection means no filter)
+    masks = [
+        full_df[column].isin(frozenset(selected))
+        for column, selected in (
+            ("Patient ID", selected_patients),
+            ("Session Type", selected_sessions),
+            ("Condition", selected_conditions),
+        )
+        if selected
+    ]
+    if masks:
+        df = full_df[np.logical_and.reduce(masks)].reset_index(drop=True)
+    else:
+        df = full_df
+    
+    # Collect examples for the selected files by week: one (week, text) row per
+    # example, grouped once; weeks whose files have no examples keep an empty list.
+    # Keys are numeric weeks (inf for Final) so they sort directly, mapped to
+    # (display label, example texts)
+    example_rows = df[["Week", "Examples"]].explode("Examples")
+    grouped = example_rows.groupby("Week", dropna=False, sort=False)["Examples"].agg(
+        lambda texts: texts.dropna().tolist()
+    )
     examples_by_week = {}
+    for week, texts in grouped.items():
+        if pd.isna(week):
+            examples_by_week[float("inf")] = ("Final", texts)
+        else:
+            examples_by_week[float(week)] = (f"Week {week:g}", texts)
     
-    # Process each file
-    for file in classified:
-        # Skip Final Interview files
-        if file.get("final_interview", False) or file.get("session_type", "") == "Final Interview":
-            continue
-            
-        patient_id = file.get("patient_id")
-        session_type = file.get("session_type")
-        week = file.get("week")
-        filename = file.get("filename")
-        condition_value = file.get("condition_value", "").strip()  # Get condition value
-        
-        # Apply filters
-        if (selected_patients and patient_id not in selected_patients) or \
-           (selected_sessions and session_type not in selected_sessions) or \
-           (selected_conditions and condition_value not in selected_conditions):
-            continue
-            
-        # Find sentiment data in enriched dataset
-        sentiment_data = None
-        if patient_id in enriched:
-            # Check each session type category
-            for session_category, files in enriched[patient_id].items():
-                if filename in files and "Sentiment Analysis" in files[filename]:
-                    sentiment_data = files[filename]["Sentiment Analysis"]
-                    break
-                    
-        # Skip if no sentiment data found
-        if not sentiment_data:
-            continue
-            
-        # Extract sentiment counts
-        sentiment_counts = sentiment_data.get("sentiment_counts", {})
-        positive_ct = sentiment_counts.get("positive", 0)
-        negative_ct = sentiment_counts.get("negative", 0)
-        neutral_ct = sentiment_counts.get("neutral", 0)
-        
-        # Handle case where counts are not numeric
-        if not isinstance(positive_ct, (int, float)):
-            try:
-                positive_ct = int(positive_ct)
-            except (ValueError, TypeError):
-                positive_ct = 0
-                
-        if not isinstance(negative_ct, (int, float)):
-            try:
-                negative_ct = int(negative_ct)
-            except (ValueError, TypeError):
-                negative_ct = 0
-                
-        if not isinstance(neutral_ct, (int, float)):
-            try:
-                neutral_ct = int(neutral_ct)
-            except (ValueError, TypeError):
-                neutral_ct = 0
-        
-        # Create row for dataframe
-        sentiment_rows.append({
-            "Patient ID": patient_id,
-            "Session Type": session_type,
-            "Week": week,
-            "Positive": positive_ct,
-            "Negative": negative_ct,
-            "Neutral": neutral_ct,
-            "Total": positive_ct + negative_ct + neutral_ct,
-            "Net Score": positive_ct - negative_ct,
-            "Filename": filename,
-            "Condition": condition_value  # Add condition value
-        })
+    return df.drop(columns="Examples"), examples_by_week
 
-        # Collect examples for this week
-        if week not in examples_by_week:
-            examples_by_week[week] = []
-            
-        # Get examples and handle different data types
-        examples_list = sentiment_data.get("examples", [])
-        if not isinstance(examples_list, list):
-            # If examples is not a list, try to convert it to one
-            if examples_list:
-                examples_list = [examples_list]
-            else:
-                examples_list = []
-                
-        for ex in examples_list:
-            example_text = ""
-            # Extract text based on the format of the example
-            if isinstance(ex, str):
-                example_text = ex
-            elif isinstance(ex, dict):
-                if 'text' in ex and isinstance(ex['text'], str):
-                    example_text = ex['text']
-                elif 'context' in ex and isinstance(ex['context'], str):
-                    example_text = ex['context']
-            
-            # Add to examples collection if we found text
-            if example_text:
-                examples_by_week[week].append(example_text)
+def prepare_sentiment_data(df):
+    """Add the Week Label display column in place (Week is already numeric, NaN for Final)."""
+    # Create week label for display purposes
+    week = df["Week"]
+    labels = np.where(week.isna(), "Final", "Week " + week.fillna(0).astype(int).astype(str))
+    df["Week Label"] = pd.Categorical(labels)
+    return df
+
+@st.cache_data
+def _sentiment_aggregates(selected_patients, selected_sessions, selected_conditions):
+    """Return the summary table, weekly line-chart data and heatmap pivot for a filter selection.
+    
+    The selections are tuples so reruns with an unchanged selection hit the cache.
+    """
+    full_df, _ = load_sentiment_data()
+    df, _ = build_sentiment_dataframe(full_df, selected_patients, selected_sessions, selected_conditions)
+    df = prepare_sentiment_data(df)
+    
+    # Summary table by week label; a fractional week shares the label of its whole week
+    df_grouped = df.groupby("Week Label", observed=True, as_index=False).agg(
+        Positive=("Positive", "sum"),
+        Negative=("Negative", "sum"),
+        Neutral=("Neutral", "sum"),
+        Total=("Total", "sum"),
+        **{"Unique Patients": ("Patient ID", "nunique"), "File Count": ("Filename", "count")}
+    )
+    
+    # Calculate percentages
+    df_grouped["Positive %"] = (df_grouped["Positive"] / df_grouped["Total"] * 100).round(1)
+    df_grouped["Negative %"] = (df_grouped["Negative"] / df_grouped["Total"] * 100).round(1)
+    df_grouped["Neutral %"] = (df_grouped["Neutral"] / df_grouped["Total"] * 100).round(1)
+    
+    # Sentiment counts per numeric week (baseline + numbered weeks; final rows have no week)
+    week_summary = df.groupby("Week", as_index=False)[["Positive", "Negative", "Neutral"]].sum()
+    
+    # Net score per participant and week for the heatmap
+    heatmap_df = (
+        df.groupby(["Patient ID", "Week Label"], observed=True)["Net Score"]
+        .sum()
+        .unstack("Week Label", fill_value=0)
+    )
+    
+    # Sentiment sums per polar-chart period; the periods can overlap
+    # (e.g. an Exposure with Researcher file in week 0), so each is its own mask
+    sentiment_names = ["Positive", "Negative", "Neutral"]
+    week = df["Week"].to_numpy(dtype=float)
+    session_type = df["Session Type"].to_numpy()
+    period_masks = np.vstack([
+        week == 0,
+        np.isnan(week),
+        session_type == "Exposure with Researcher",
+        session_type == "Exposure on Own",
+    ])
+    counts = df[sentiment_names].to_numpy()
+    period_sums = pd.DataFrame(
+        period_masks.astype(counts.dtype) @ counts,
+        index=["Baseline", "Final", "ER", "EP"],
+        columns=sentiment_names
+    )
     
-    # Create DataFrame
-    df = pd.DataFrame(sentiment_rows)
-    return df, examples_by_week
+    # Sentiment sums per condition, in order of first appearance
+    condition_sums = df.groupby("Condition", sort=False, observed=True)[sentiment_names].sum()
+    
+    return df_grouped, week_summary, heatmap_df, period_sums, condition_sums
+
+@st.fragment
+def show_sentiment_examples(examples_bank):
+    """Render the per-week example expanders once the user asks for them.
+    
+    Runs as a fragment, so ticking the checkbox only reruns this section.
+    """
+    st.subheader("Sentiment Examples by Week")
+    
+    if not st.checkbox("Show examples"):
+        return
+    
+    # Create expanders for each week
+    for week in sorted(examples_bank):
+        week_label, examples = examples_bank[week]
+        with st.expander(f"{week_label} Examples"):
+            if examples:
+                for example in examples:
+                    st.markdown(f"- {example}")
+            else:
+                st.info("No examples available for this week.")
 
 def main():
     st.title("Sentiment Analysis")
 
-    # Load data
-    classified = load_json(CLASSIFIED_PATH)
-    
-    # Filter out Final Interview files from filter options
-    non_final_classified = [f for f in classified if not f.get("final_interview", False) 
-                           and f.get("session_type", "") != "Final Interview"]
-    
-    # Get filter options
-    all_patients = sorted(set(f["patient_id"] for f in non_final_classified if f.get("patient_id")))
-    all_sessions = sorted(set(f["session_type"] for f in non_final_classified if f.get("session_type")))
-    all_conditions = sorted(list(set(f.get("condition_value", "").strip() for f in non_final_classified if f.get("condition_value"))))
+    # Load data once; filter options leave out Final Interview files
+    full_df, (all_patients, all_sessions, all_conditions) = load_sentiment_data()
     
     # Create filters
     col1, col2, col3 = st.columns(3)
@@ -151,7 +286,7 @@ def main():
         selected_conditions = st.multiselect("Select Condition(s)", options=all_conditions, default=all_conditions)
     
     # Build dataframe with sentiment data
-    df, examples_bank = build_sentiment_dataframe(selected_patients, selected_sessions, selected_conditions)
+    df, examples_bank = build_sentiment_dataframe(full_df, selected_patients, selected_sessions, selected_conditions)
     
     if df.empty:
         st.warning("No sentiment data available for selected filters.")
@@ -165,41 +300,15 @@ def main():
     
     # --- Data Preparation ---
     
-    # Convert Week to numeric for proper sorting and grouping
-    df["Week"] = pd.to_numeric(df["Week"], errors="coerce")
+    df = prepare_sentiment_data(df)
     
-    # Create week label for display purposes
-    df["Week Label"] = df["Week"].apply(
-        lambda w: "Final" if pd.isna(w) else f"Week {int(w)}"
+    # Aggregations are cached per filter selection
+    df_grouped, week_summary, heatmap_df, period_sums, condition_sums = _sentiment_aggregates(
+        tuple(selected_patients), tuple(selected_sessions), tuple(selected_conditions)
     )
     
-    # Split data into numeric weeks and final weeks
-    numeric_df = df[df["Week"].notna()]   # baseline + numbered weeks
-    final_df = df[df["Week"].isna()]      # final-interview rows
-    
     # --- Summary Table ---
     
-    # Group by week and calculate statistics
-    df_grouped = df.groupby("Week Label").agg({
-        "Positive": "sum",
-        "Negative": "sum",
-        "Neutral": "sum",
-        "Total": "sum",
-        "Patient ID": "nunique",
-        "Filename": "count"
-    }).reset_index()
-    
-    # Rename columns for clarity
-    df_grouped = df_grouped.rename(columns={
-        "Patient ID": "Unique Patients",
-        "Filename": "File Count"
-    })
-    
-    # Calculate percentages
-    df_grouped["Positive %"] = (df_grouped["Positive"] / df_grouped["Total"] * 100).round(1)
-    df_grouped["Negative %"] = (df_grouped["Negative"] / df_grouped["Total"] * 100).round(1)
-    df_grouped["Neutral %"] = (df_grouped["Neutral"] / df_grouped["Total"] * 100).round(1)
-    
     # Display statistics table
     st.subheader("Sentiment Statistics by Week")
     st.dataframe(df_grouped.style.set_properties(**{'background-color': '#f9f9f9', 'color': '#333'}))
@@ -208,14 +317,7 @@ def main():
     
     st.subheader("Sentiment Trends Over Time")
     
-    if not numeric_df.empty:
-        # Group by week and sum sentiment counts
-        week_summary = numeric_df.groupby("Week").agg({
-            "Positive": "sum",
-            "Negative": "sum", 
-            "Neutral": "sum"
-        }).reset_index()
-        
+    if not week_summary.empty:
         # Create simple line chart
         fig1 = px.line(
             week_summary,
@@ -227,13 +329,10 @@ def main():
             markers=True
         )
         
-        # Add final interview data if available
-        if not final_df.empty:
-            final_counts = {
-                "Positive": final_df["Positive"].sum(),
-                "Negative": final_df["Negative"].sum(),
-                "Neutral": final_df["Neutral"].sum()
-            }
+        # Add final interview data if available (its sums are already in the summary table)
+        final_rows = df_grouped[df_grouped["Week Label"] == "Final"]
+        if not final_rows.empty:
+            final_counts = final_rows.iloc[0][["Positive", "Negative", "Neutral"]].to_dict()
             
             last_week = week_summary["Week"].max()
             final_week = last_week + 1
@@ -272,14 +371,6 @@ def main():
     st.subheader("Sentiment Polarity by Participant and Week")
     
     if not df.empty and len(df["Patient ID"].unique()) > 0:
-        # Create pivot table for heatmap
-        heatmap_df = df.pivot_table(
-            index="Patient ID",
-            columns="Week Label",
-            values="Net Score",
-            aggfunc="sum"
-        ).fillna(0)
-        
         # Create heatmap
         fig2 = px.imshow(
             heatmap_df,
@@ -303,8 +394,8 @@ def main():
     detail_cols = ["Patient ID", "Session Type", "Week", "Filename", "Condition", "Positive", "Negative", "Neutral", "Net Score"]
     detail_df = df[detail_cols].copy()
     
-    # Format the Week column for display
-    detail_df["Week"] = detail_df["Week"].apply(lambda w: "Final" if pd.isna(w) else f"Week {int(w)}" if isinstance(w, (int, float)) else w)
+    # Show the week as its display label
+    detail_df["Week"] = df["Week Label"]
     
     # Sort by Session Type, Patient ID, and Week
     detail_df = detail_df.sort_values(["Session Type", "Patient ID", "Week"])
@@ -312,216 +403,126 @@ def main():
     # Display the table with a filter
     st.dataframe(detail_df, use_container_width=True)
     
-    # --- VISUAL 3: Polar "Rose" Comparison ---
+    # Polar comparisons in tabs so only one chart is shown at a time
+    session_tab, condition_tab = st.tabs(["By Session Type", "By Condition"])
     
-    st.subheader("Session Type Sentiment Comparison (Interactive)")
+    with session_tab:
+        # --- VISUAL 3: Polar "Rose" Comparison ---
+        
+        st.subheader("Session Type Sentiment Comparison (Interactive)")
 
-    # Map session types to labels
-    session_type_map = {
-        0: "Baseline",
-        None: "Final",
-        "Exposure with Researcher": "ER",
-        "Exposure on Own": "EP"
-    }
+        # Map session types to labels
+        session_type_map = {
+            0: "Baseline",
+            None: "Final",
+            "Exposure with Researcher": "ER",
+            "Exposure on Own": "EP"
+        }
 
-    # Debug: Print unique session types in the dataset
-    st.write("Available session types in data:", df["Session Type"].unique())
-    
-    # Collect all available session types
-    available_types = {}
-    
-    # Baseline (Week 0)
-    baseline_df = df[df["Week"] == 0]
-    if not baseline_df.empty:
-        available_types["Baseline"] = baseline_df
-    else:
-        # Create empty dataframe with the same structure
-        available_types["Baseline"] = pd.DataFrame(columns=df.columns)
-        available_types["Baseline"]["Positive"] = [0]
-        available_types["Baseline"]["Negative"] = [0]
-        available_types["Baseline"]["Neutral"] = [0]
-    
-    # Final (Week is None)
-    final_df = df[df["Week"].isna()]
-    if not final_df.empty:
-        available_types["Final"] = final_df
-    else:
-        # Create empty dataframe with the same structure
-        available_types["Final"] = pd.DataFrame(columns=df.columns)
-        available_types["Final"]["Positive"] = [0]
-        available_types["Final"]["Negative"] = [0]
-        available_types["Final"]["Neutral"] = [0]
-    
-    # ER - Always include even if empty
-    # Match "Exposure with Researcher"
-    er_df = df[df["Session Type"] == "Exposure with Researcher"]
-    if not er_df.empty:
-        available_types["ER"] = er_df
-        # Debug: Show ER data
-        st.write("ER Data Found:", len(er_df), "rows")
-    else:
-        # Create empty dataframe with the same structure
-        available_types["ER"] = pd.DataFrame(columns=df.columns)
-        available_types["ER"]["Positive"] = [0]
-        available_types["ER"]["Negative"] = [0]
-        available_types["ER"]["Neutral"] = [0]
-        # Debug: No ER data found
-        st.write("No ER data found in the filtered dataset")
-    
-    # EP - Always include even if empty
-    # Match "Exposure on Own"
-    ep_df = df[df["Session Type"] == "Exposure on Own"]
-    if not ep_df.empty:
-        available_types["EP"] = ep_df
-        # Debug: Show EP data
-        st.write("EP Data Found:", len(ep_df), "rows")
-    else:
-        # Create empty dataframe with the same structure
-        available_types["EP"] = pd.DataFrame(columns=df.columns)
-        available_types["EP"]["Positive"] = [0]
-        available_types["EP"]["Negative"] = [0]
-        available_types["EP"]["Neutral"] = [0]
-        # Debug: No EP data found
-        st.write("No EP data found in the filtered dataset")
-
-    sentiment_types = list(available_types.keys())
-    sentiment_names = ["Positive", "Negative", "Neutral"]
-    color_map = {"Baseline": "#1E90FF", "Final": "#FF6347", "ER": "#32CD32", "EP": "#FFD700"}
+        # Baseline, Final, ER and EP all get a trace; empty periods count as zero
+        sentiment_types = list(period_sums.index)
+        sentiment_names = ["Positive", "Negative", "Neutral"]
+        color_map = {"Baseline": "#1E90FF", "Final": "#FF6347", "ER": "#32CD32", "EP": "#FFD700"}
 
-    # Create a trace for each session type
-    traces = []
-    for period in sentiment_types:
-        period_counts = [available_types[period][sent].sum() for sent in sentiment_names]
-        traces.append(go.Scatterpolar(
-            r=period_counts + [period_counts[0]],
-            theta=sentiment_names + [sentiment_names[0]],
-            name=period,
-            line=dict(color=color_map.get(period, None)),
-            visible=True  # All visible by default
-        ))
+        # Create a trace for each session type
+        traces = []
+        for period in sentiment_types:
+            period_counts = period_sums.loc[period].tolist()
+            traces.append(go.Scatterpolar(
+                r=period_counts + [period_counts[0]],
+                theta=sentiment_names + [sentiment_names[0]],
+                name=period,
+                line=dict(color=color_map.get(period, None)),
+                visible=True  # All visible by default
+            ))
 
-    fig3 = go.Figure(data=traces)
-    
-    # Configure the layout for better legend interactivity
-    fig3.update_layout(
-        polar=dict(radialaxis=dict(visible=True)),
-        title="Session Type Sentiment Comparison (Click legend items to toggle)",
-        legend=dict(
-            title="Session Types",
-            itemclick="toggle",      # Toggle single trace
-            itemdoubleclick="toggleothers",  # Toggle all others
-            orientation="h",        # Horizontal legend
-            yanchor="bottom",       # Position at bottom
-            y=1.02,                # Slightly above the chart
-            xanchor="right",        # Right-aligned
-            x=1                    # At the right edge
+        fig3 = go.Figure(data=traces)
+        
+        # Configure the layout for better legend interactivity
+        fig3.update_layout(
+            polar=dict(radialaxis=dict(visible=True)),
+            title="Session Type Sentiment Comparison (Click legend items to toggle)",
+            legend=dict(
+                title="Session Types",
+                itemclick="toggle",      # Toggle single trace
+                itemdoubleclick="toggleothers",  # Toggle all others
+                orientation="h",        # Horizontal legend
+                yanchor="bottom",       # Position at bottom
+                y=1.02,                # Slightly above the chart
+                xanchor="right",        # Right-aligned
+                x=1                    # At the right edge
+            )
         )
-    )
-    
-    # Add annotation explaining how to use the legend
-    fig3.add_annotation(
-        text="Click legend items to show/hide • Double-click to isolate",
-        xref="paper", yref="paper",
-        x=0.5, y=-0.1,
-        showarrow=False,
-        font=dict(size=10, color="gray")
-    )
-    
-    st.plotly_chart(fig3, use_container_width=True)
-
-    # --- NEW VISUAL: Condition Type Sentiment Comparison ---
-    
-    st.subheader("Condition Type Sentiment Comparison (Interactive)")
-    
-    # Get unique conditions
-    unique_conditions = df["Condition"].dropna().unique()
-    
-    # Collect all available condition types
-    condition_types = {}
-    
-    # Create a dataframe for each condition type
-    for condition in unique_conditions:
-        condition_df = df[df["Condition"] == condition]
-        if not condition_df.empty:
-            condition_types[condition] = condition_df
-            # Debug: Show condition data
-            st.write(f"{condition} Data Found:", len(condition_df), "rows")
-        else:
-            # Create empty dataframe with the same structure
-            condition_types[condition] = pd.DataFrame(columns=df.columns)
-            condition_types[condition]["Positive"] = [0]
-            condition_types[condition]["Negative"] = [0]
-            condition_types[condition]["Neutral"] = [0]
-    
-    condition_names = list(condition_types.keys())
-    # Use Plotly's qualitative color schemes for condition type comparison
-    condition_colors = px.colors.qualitative.Plotly
-    condition_color_map = {condition: condition_colors[i % len(condition_colors)] 
-                           for i, condition in enumerate(condition_names)}
-    
-    # Create a trace for each condition type
-    condition_traces = []
-    for condition in condition_names:
-        condition_counts = [condition_types[condition][sent].sum() for sent in sentiment_names]
-        condition_traces.append(go.Scatterpolar(
-            r=condition_counts + [condition_counts[0]],
-            theta=sentiment_names + [sentiment_names[0]],
-            name=condition,
-            line=dict(color=condition_color_map.get(condition, None)),
-            visible=True  # All visible by default
-        ))
-    
-    fig_conditions = go.Figure(data=condition_traces)
-    
-    # Configure the layout for better legend interactivity
-    fig_conditions.update_layout(
-        polar=dict(radialaxis=dict(visible=True)),
-        title="Condition Type Sentiment Comparison (Click legend items to toggle)",
-        legend=dict(
-            title="Condition Types",
-            itemclick="toggle",      # Toggle single trace
-            itemdoubleclick="toggleothers",  # Toggle all others
-            orientation="h",        # Horizontal legend
-            yanchor="bottom",       # Position at bottom
-            y=1.02,                # Slightly above the chart
-            xanchor="right",        # Right-aligned
-            x=1                    # At the right edge
+        
+        # Add annotation explaining how to use the legend
+        fig3.add_annotation(
+            text="Click legend items to show/hide • Double-click to isolate",
+            xref="paper", yref="paper",
+            x=0.5, y=-0.1,
+            showarrow=False,
+            font=dict(size=10, color="gray")
         )
-    )
-    
-    # Add annotation explaining how to use the legend
-    fig_conditions.add_annotation(
-        text="Click legend items to show/hide • Double-click to isolate",
-        xref="paper", yref="paper",
-        x=0.5, y=-0.1,
-        showarrow=False,
-        font=dict(size=10, color="gray")
-    )
+        
+        st.plotly_chart(fig3, use_container_width=True)
     
-    st.plotly_chart(fig_conditions, use_container_width=True)
+    with condition_tab:
+        # --- NEW VISUAL: Condition Type Sentiment Comparison ---
+        
+        st.subheader("Condition Type Sentiment Comparison (Interactive)")
+        
+        # Conditions present in the filtered data, in order of first appearance
+        condition_names = list(condition_sums.index)
+        
+        # Use Plotly's qualitative color schemes for condition type comparison
+        condition_colors = px.colors.qualitative.Plotly
+        condition_color_map = {condition: condition_colors[i % len(condition_colors)] 
+                               for i, condition in enumerate(condition_names)}
+        
+        # Create a trace for each condition type
+        condition_traces = []
+        for condition in condition_names:
+            condition_counts = condition_sums.loc[condition].tolist()
+            condition_traces.append(go.Scatterpolar(
+                r=condition_counts + [condition_counts[0]],
+                theta=sentiment_names + [sentiment_names[0]],
+                name=condition,
+                line=dict(color=condition_color_map.get(condition, None)),
+                visible=True  # All visible by default
+            ))
+        
+        fig_conditions = go.Figure(data=condition_traces)
+        
+        # Configure the layout for better legend interactivity
+        fig_conditions.update_layout(
+            polar=dict(radialaxis=dict(visible=True)),
+            title="Condition Type Sentiment Comparison (Click legend items to toggle)",
+            legend=dict(
+                title="Condition Types",
+                itemclick="toggle",      # Toggle single trace
+                itemdoubleclick="toggleothers",  # Toggle all others
+                orientation="h",        # Horizontal legend
+                yanchor="bottom",       # Position at bottom
+                y=1.02,                # Slightly above the chart
+                xanchor="right",        # Right-aligned
+                x=1                    # At the right edge
+            )
+        )
+        
+        # Add annotation explaining how to use the legend
+        fig_conditions.add_annotation(
+            text="Click legend items to show/hide • Double-click to isolate",
+            xref="paper", yref="paper",
+            x=0.5, y=-0.1,
+            showarrow=False,
+            font=dict(size=10, color="gray")
+        )
+        
+        st.plotly_chart(fig_conditions, use_container_width=True)
+        
     
     # --- Examples by Week Section ---
     
-    st.subheader("Sentiment Examples by Week")
-    
-    # Define safe sorting function for weeks
-    def safe_sort_key(item):
-        if item is None:
-            return float('inf')  # Place None values at the end
-        try:
-            return float(item)  # Try to convert to numeric for proper sorting
-        except (ValueError, TypeError):
-            return str(item)  # Fall back to string comparison
-    
-    # Create expanders for each week
-    for week in sorted(examples_bank.keys(), key=safe_sort_key):
-        week_label = "Final" if week is None or pd.isna(week) else f"Week {week}"
-        with st.expander(f"{week_label} Examples"):
-            if examples_bank[week]:
-                for example in examples_bank[week]:
-                    st.markdown(f"- {example}")
-            else:
-                st.info("No examples available for this week.")
+    show_sentiment_examples(examples_bank)
 
 if __name__ == "__main__":
     main()
@@ -1,80 +1,191 @@
+import os
 import streamlit as st
 import pandas as pd
-import json
+import orjson
+import ijson
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from collections import Counter
 import numpy as np
 
+# Numba is optional; without it the metrics are computed with NumPy only
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # --- Paths to your JSON files ---
 CLASSIFIED_PATH = "classified_output_1.json"
 ENRICHED_PATH = "transcript_insights_updated.json"
 ENHANCED_ANALYSIS_PATH = "enhanced_transcript_analysis.json"
+# Optional flat copy of the enhanced analysis turns, written by convert_to_ndjson.py
+ENHANCED_TURNS_PATH = "enhanced_turns.ndjson"
+# Bump whenever _parse_all_metrics() changes the frame it returns, so a cache
+# written by older code is not served
+METRICS_CACHE_VERSION = 2
+METRICS_CACHE_PATH = f".lexical_metrics_cache.v{METRICS_CACHE_VERSION}.parquet"
 
 @st.cache_data
 def load_json(path):
-    with open(path, encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+@st.cache_data
+def load_basic_statistics(path):
+    """Stream transcript insights into a {(patient_id, filename): basic_statistics} lookup.
+    
+    If a file appears under several session categories the first one wins.
+    """
+    stats_index = {}
+    with open(path, "rb") as f:
+        for patient_id, categories in ijson.kvitems(f, "", use_float=True):
+            for files in categories.values():
+                for filename, file_data in files.items():
+                    if "basic_statistics" in file_data and (patient_id, filename) not in stats_index:
+                        stats_index[(patient_id, filename)] = file_data["basic_statistics"]
+    return stats_index
+
+def load_turns(path):
+    """Return one (filename, speaker, is_question) row per turn of the enhanced analysis.
+    
+    Reads ENHANCED_TURNS_PATH when it is at least as new as the JSON, otherwise streams the JSON.
+    """
+    if os.path.exists(ENHANCED_TURNS_PATH) and os.path.getmtime(ENHANCED_TURNS_PATH) >= os.path.getmtime(path):
+        turns = pd.read_json(ENHANCED_TURNS_PATH, lines=True, dtype=False)
+        return turns.reindex(columns=["filename", "speaker", "is_question"])
+    
+    turn_rows = []
+    with open(path, "rb") as f:
+        for filename, file_data in ijson.kvitems(f, "by_file", use_float=True):
+            turn_rows.extend(
+                (filename, turn.get('speaker', ''), bool(turn.get('is_question', False)))
+                for turn in file_data.get('turns', [])
+            )
+    return pd.DataFrame(turn_rows, columns=["filename", "speaker", "is_question"])
+
+@st.cache_data
+def load_question_counts(path):
+    """Count questions per file by speaker from the enhanced analysis turns.
+    
+    Returns a DataFrame indexed by filename with caregiver_questions and plwd_questions columns.
+    """
+    turns = load_turns(path)
+    
+    # Lowercase the speaker labels in one vectorized pass and keep the two speakers we count
+    turns["speaker"] = turns["speaker"].str.lower().astype("category")
+    turns = turns[turns["speaker"].isin(["caregiver", "plwd"])]
+    
+    # Count questions by speaker
+    question_counts = turns.groupby(["filename", "speaker"], observed=True)["is_question"].sum().unstack(fill_value=0)
+    question_counts = question_counts.reindex(columns=["caregiver", "plwd"], fill_value=0)
+    return question_counts.rename(columns={"caregiver": "caregiver_questions", "plwd": "plwd_questions"})
+
+# Row count from which the Numba metrics kernel is used instead of NumPy
+NUMBA_MIN_ROWS = 100_000
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _metrics_kernel(caregiver_words, plwd_words, caregiver_turns, plwd_turns, total_questions, out):
+        """Fill out[i] with (word ratio, caregiver density, PLWD density, question-word ratio)."""
+        for i in prange(caregiver_words.size):
+            total_words = caregiver_words[i] + plwd_words[i]
+            out[i, 0] = plwd_words[i] / total_words if total_words > 0 else 0.0
+            out[i, 1] = caregiver_words[i] / caregiver_turns[i] if caregiver_turns[i] > 0 else 0.0
+            out[i, 2] = plwd_words[i] / plwd_turns[i] if plwd_turns[i] > 0 else 0.0
+            out[i, 3] = total_questions[i] / total_words if total_words > 0 else 0.0
+
+# Points per patient above which the spiral uses WebGL (Scatterpolargl) traces
+WEBGL_MIN_POINTS = 50
+
+# Qualitative palette cycled over the patients in the spiral
+PATIENT_COLORS = px.colors.qualitative.Plotly
+
+# Count columns collected per file before the metrics are derived
+RAW_COUNT_COLUMNS = ["caregiver_words", "plwd_words", "caregiver_turns", "plwd_turns", "caregiver_questions", "plwd_questions"]
 
 # Function to calculate proxy lexical diversity metrics from available statistics
-def calculate_proxy_lexical_metrics(stats, caregiver_questions=0, plwd_questions=0):
+def calculate_proxy_lexical_metrics(counts):
     """
-    Calculates proxy metrics for lexical diversity using available statistics:
+    Calculates proxy metrics for lexical diversity for every row of a DataFrame
+    with the RAW_COUNT_COLUMNS:
     - Word Ratio: Ratio of PLWD words to total words (measure of conversational balance)
     - Vocabulary Density: Words per turn (higher values may indicate more complex speech)
     - Question Ratio: Questions to total words (measure of interactive engagement)
     """
-    caregiver_words = stats.get('caregiver_words', 0)
-    plwd_words = stats.get('plwd_words', 0)
-    caregiver_turns = stats.get('caregiver_turns', 0)
-    plwd_turns = stats.get('plwd_turns', 0)
-    
-    total_words = caregiver_words + plwd_words
-    total_turns = caregiver_turns + plwd_turns
-    total_questions = caregiver_questions + plwd_questions
-    
-    # Avoid division by zero
-    word_ratio = plwd_words / total_words if total_words > 0 else 0.0
-    
-    # Words per turn (vocabulary density)
-    caregiver_density = caregiver_words / caregiver_turns if caregiver_turns > 0 else 0.0
-    plwd_density = plwd_words / plwd_turns if plwd_turns > 0 else 0.0
-    
-    # Question to word ratio (engagement measure)
-    question_word_ratio = total_questions / total_words if total_words > 0 else 0.0
-    
-    return {
-        "word_ratio": word_ratio,
-        "caregiver_density": caregiver_density,
-        "plwd_density": plwd_density,
-        "question_word_ratio": question_word_ratio
-    }
-
-# Main function for Streamlit page
-def main():
-    st.title("Lexical Diversity Analysis")
+    caregiver_words = counts['caregiver_words'].to_numpy(dtype=float)
+    plwd_words = counts['plwd_words'].to_numpy(dtype=float)
+    caregiver_turns = counts['caregiver_turns'].to_numpy(dtype=float)
+    plwd_turns = counts['plwd_turns'].to_numpy(dtype=float)
     
-    # Load data
-    classified = load_json(CLASSIFIED_PATH)
-    enriched = load_json(ENRICHED_PATH)
-    enhanced = load_json(ENHANCED_ANALYSIS_PATH)
+    total_questions = counts['caregiver_questions'].to_numpy(dtype=float) + counts['plwd_questions'].to_numpy(dtype=float)
     
-    # Filter out Final Interview files from filter options
-    non_final_classified = [f for f in classified if not f.get("final_interview", False) 
-                           and f.get("session_type", "") != "Final Interview"]
+    if NUMBA_AVAILABLE and len(counts) >= NUMBA_MIN_ROWS:
+        # One parallel pass writing all four metrics
+        metrics = np.empty((len(counts), 4))
+        _metrics_kernel(caregiver_words, plwd_words, caregiver_turns, plwd_turns, total_questions, metrics)
+        word_ratio, caregiver_density, plwd_density, question_word_ratio = metrics.T
+    else:
+        total_words = caregiver_words + plwd_words
+        
+        # Avoid division by zero: rows with a zero denominator get 0.0
+        def ratio(numerator, denominator):
+            return np.divide(numerator, denominator, out=np.zeros(len(counts)), where=denominator > 0)
+        
+        word_ratio = ratio(plwd_words, total_words)
+        # Words per turn (vocabulary density)
+        caregiver_density = ratio(caregiver_words, caregiver_turns)
+        plwd_density = ratio(plwd_words, plwd_turns)
+        # Question to word ratio (engagement measure)
+        question_word_ratio = ratio(total_questions, total_words)
     
-    # Get filter options
-    all_patients = sorted(set(f["patient_id"] for f in non_final_classified if f.get("patient_id")))
-    all_sessions = sorted(set(f["session_type"] for f in non_final_classified if f.get("session_type")))
-    all_conditions = sorted(list(set(f.get("condition_value", "").strip() for f in non_final_classified if f.get("condition_value"))))
+    return pd.DataFrame({
+        "Word Ratio": word_ratio,
+        "Caregiver Density": caregiver_density,
+        "PLWD Density": plwd_density,
+        "Question-Word Ratio": question_word_ratio,
+    }, index=counts.index)
+
+@st.cache_data
+def load_non_final_classified():
+    """Return the classified files that are not part of the final interview, filtered once."""
+    return [f for f in load_json(CLASSIFIED_PATH)
+            if not (f.get("final_interview", False) or f.get("session_type", "") == "Final Interview")]
+
+@st.cache_data
+def load_filter_options():
+    """Return sorted (patients, sessions, conditions) tuples for the filter widgets.
     
-    # Create filters
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        selected_patients = st.multiselect("Select Participant(s)", options=all_patients, default=all_patients)
-    with col2:
-        selected_sessions = st.multiselect("Select Session Type(s)", options=all_sessions, default=all_sessions)
-    with col3:
-        selected_conditions = st.multiselect("Select Condition(s)", options=all_conditions, default=all_conditions)
+    Final Interview files are left out of the options.
+    """
+    non_final_classified = load_non_final_classified()
+    all_patients = tuple(sorted({f["patient_id"] for f in non_final_classified if f.get("patient_id")}))
+    all_sessions = tuple(sorted({f["session_type"] for f in non_final_classified if f.get("session_type")}))
+    all_conditions = tuple(sorted({f.get("condition_value", "").strip() for f in non_final_classified if f.get("condition_value")}))
+    return all_patients, all_sessions, all_conditions
+
+@st.cache_data
+def compute_all_metrics():
+    """Build the lexical metrics for every non-final file, ignoring the filters.
+    
+    Cached so the JSON is only processed once; main() filters the result. The frame
+    is also written to METRICS_CACHE_PATH as parquet so a restart skips the JSON
+    parsing unless one of the source files is newer than the cache file.
+    """
+    source_mtime = max(os.path.getmtime(path) for path in (CLASSIFIED_PATH, ENRICHED_PATH, ENHANCED_ANALYSIS_PATH))
+    if os.path.exists(METRICS_CACHE_PATH) and os.path.getmtime(METRICS_CACHE_PATH) >= source_mtime:
+        return pd.read_parquet(METRICS_CACHE_PATH)
+    
+    df_all = _parse_all_metrics()
+    df_all.to_parquet(METRICS_CACHE_PATH, index=False)
+    return df_all
+
+def _parse_all_metrics():
+    # Load data
+    non_final_classified = load_non_final_classified()
+    stats_index = load_basic_statistics(ENRICHED_PATH)
+    question_counts = load_question_counts(ENHANCED_ANALYSIS_PATH)
     
     # Extract data for lexical analysis using available metrics
     metrics_data = []
@@ -86,164 +197,167 @@ def main():
         week = file.get("week")
         filename = file.get("filename")
         
-        # Apply filters
-        if (selected_patients and patient_id not in selected_patients) or \
-           (selected_sessions and session_type not in selected_sessions) or \
-           (selected_conditions and condition_value not in selected_conditions):
+        # Get basic statistics from transcript_insights.json
+        stats = stats_index.get((patient_id, filename))
+        if stats is None:
             continue
         
-        # Find enriched stats in transcript_insights.json
-        enriched_patient_data = None
-        if patient_id in enriched:
-            # Check each session type category
-            for session_category in enriched[patient_id].values():
-                if filename in session_category and "basic_statistics" in session_category[filename]:
-                    enriched_patient_data = session_category[filename]
-                    break
-        
-        if not enriched_patient_data or "basic_statistics" not in enriched_patient_data:
-            continue
-            
-        # Get basic statistics
-        stats = enriched_patient_data["basic_statistics"]
-        
-        # Get question counts from enhanced_transcript_analysis.json
-        caregiver_questions = 0
-        plwd_questions = 0
-        
-        if 'by_file' in enhanced and filename in enhanced['by_file']:
-            file_data = enhanced['by_file'][filename]
-            
-            # Process each turn to count questions
-            if 'turns' in file_data:
-                for turn in file_data['turns']:
-                    speaker = turn.get('speaker', '').lower()
-                    is_question = turn.get('is_question', False)
-                    
-                    # Count questions by speaker
-                    if is_question:
-                        if speaker == 'caregiver':
-                            caregiver_questions += 1
-                        elif speaker == 'plwd':
-                            plwd_questions += 1
-        
-        # Calculate proxy lexical metrics from available statistics
-        metrics = calculate_proxy_lexical_metrics(stats, caregiver_questions, plwd_questions)
-        
-        # Add to data collection
+        # Add raw counts to data collection; the metrics are computed for all rows at once
         metrics_data.append({
             "Patient ID": patient_id,
             "Session Type": session_type,
             "Week": week,
             "Filename": filename,  # Add filename column
             "Condition": condition_value, # Add Condition column
-            "Word Ratio": metrics["word_ratio"],
-            "Caregiver Density": metrics["caregiver_density"],
-            "PLWD Density": metrics["plwd_density"],
-            "Question-Word Ratio": metrics["question_word_ratio"],
-            "Total Words": stats.get("caregiver_words", 0) + stats.get("plwd_words", 0)
+            "caregiver_words": stats.get("caregiver_words", 0),
+            "plwd_words": stats.get("plwd_words", 0),
+            "caregiver_turns": stats.get("caregiver_turns", 0),
+            "plwd_turns": stats.get("plwd_turns", 0)
         })
     
     # Create DataFrame
-    df_metrics = pd.DataFrame(metrics_data)
+    df_all = pd.DataFrame(metrics_data)
     
-    if df_metrics.empty:
-        st.warning("No lexical data available for selected filters.")
-        return
+    if df_all.empty:
+        return df_all
     
-    # Display summary metrics
-    st.subheader("Lexical Diversity Metrics Summary")
-    # Add "Condition" to the displayed columns (removed Word Ratio)
-    display_df_metrics = df_metrics[["Patient ID", "Session Type", "Week", "Condition", "Filename", "Caregiver Density", "PLWD Density", "Question-Word Ratio", "Total Words"]]
-    st.dataframe(display_df_metrics.style.format({
-        "Caregiver Density": "{:.1f}", 
-        "PLWD Density": "{:.1f}",
-        "Question-Word Ratio": "{:.3f}",
-        "Total Words": "{:,}"
-    }))
+    # Get question counts from enhanced_transcript_analysis.json
+    df_all = df_all.join(question_counts, on="Filename")
+    df_all[["caregiver_questions", "plwd_questions"]] = df_all[["caregiver_questions", "plwd_questions"]].fillna(0)
     
-    # Interactive Visualizations with Plotly
-    st.subheader("Interactive Visualizations")
+    # Calculate proxy lexical metrics from available statistics
+    total_words = df_all["caregiver_words"] + df_all["plwd_words"]
+    df_all = pd.concat([
+        df_all.drop(columns=RAW_COUNT_COLUMNS),
+        calculate_proxy_lexical_metrics(df_all)
+    ], axis=1)
+    df_all["Total Words"] = total_words
     
-    # 1. Word Ratio Trend Over Weeks - Radial Spiral Timeline
-    if 'Week' in df_metrics.columns and df_metrics['Week'].dtype == 'object':  # Ensure 'Week' is numeric or convertible
-        df_metrics['Week'] = pd.to_numeric(df_metrics['Week'], errors='coerce')
-        df_metrics = df_metrics.dropna(subset=['Week'])
+    # Smaller dtypes: float32 metrics and categorical ID columns
+    for col in ("Word Ratio", "Caregiver Density", "PLWD Density", "Question-Word Ratio"):
+        df_all[col] = df_all[col].astype("float32")
+    for col in ("Patient ID", "Session Type", "Condition", "Filename"):
+        df_all[col] = df_all[col].astype("category")
     
-    if not df_metrics.empty:
-        import plotly.graph_objects as go
-        from plotly.subplots import make_subplots
-        
-        # Create a figure with polar subplot
-        fig_spiral = make_subplots(specs=[[{"type": "polar"}]])
-        
-        # Get unique patients for coloring
-        unique_patients = df_metrics["Patient ID"].unique()
-        
-        # Create color map for patients
-        colors = px.colors.qualitative.Plotly
-        color_map = {patient: colors[i % len(colors)] for i, patient in enumerate(unique_patients)}
+    # Parse Week once; files without a numeric week are left out
+    df_all["Week"] = pd.to_numeric(df_all["Week"], errors="coerce").astype("Int16")
+    df_all = df_all.dropna(subset=["Week"]).reset_index(drop=True)
+    return df_all
+
+def filter_metrics(df_all, selected_patients, selected_sessions, selected_conditions):
+    """Return the metrics rows matching the filters (an empty selection means no filter).
+    
+    A column whose every value is selected (the multiselect default) is not masked.
+    """
+    mask = None
+    for column, selected in (
+        ("Patient ID", selected_patients),
+        ("Session Type", selected_sessions),
+        ("Condition", selected_conditions),
+    ):
+        if not selected:
+            continue
+        values = df_all[column]
+        if not values.hasnans and set(values.cat.categories) <= set(selected):
+            continue
+        column_mask = values.isin(selected).to_numpy()
+        mask = column_mask if mask is None else mask & column_mask
+    
+    if mask is None:
+        return df_all
+    return df_all[mask].reset_index(drop=True)
+
+@st.cache_data
+def patient_color_map(patients):
+    """Map each patient in the tuple to a palette color, in order."""
+    return {patient: PATIENT_COLORS[i % len(PATIENT_COLORS)] for i, patient in enumerate(patients)}
+
+# The figure builders below are cached per filter selection, passed as a tuple of
+# (patients, sessions, conditions) tuples, so unchanged reruns reuse the figure.
+
+def _filtered_chart_metrics(filters):
+    return filter_metrics(compute_all_metrics(), *filters)
+
+@st.cache_resource
+def build_spiral_figure(filters, animate):
+    """Build the PLWD density radial spiral timeline, with per-week frames if animate is set."""
+    df_metrics = _filtered_chart_metrics(filters)
+    
+    # Create a figure with polar subplot
+    fig_spiral = make_subplots(specs=[[{"type": "polar"}]])
+    
+    # Get unique patients for coloring
+    unique_patients = df_metrics["Patient ID"].unique()
+    
+    # Create color map for patients
+    color_map = patient_color_map(tuple(unique_patients))
+    
+    # WebGL traces once a patient has many points; SVG is fine for small series
+    polar_trace = go.Scatterpolargl if df_metrics["Patient ID"].value_counts().max() > WEBGL_MIN_POINTS else go.Scatterpolar
+    
+    # Add traces for each patient (using PLWD Density instead of Word Ratio)
+    patient_series = {}
+    for patient in unique_patients:
+        patient_data = df_metrics[df_metrics["Patient ID"] == patient].sort_values("Week")
+        # Week-sorted arrays reused by the animation frames below
+        patient_series[patient] = (patient_data["Week"].to_numpy(), patient_data["PLWD Density"].to_numpy())
         
-        # Add traces for each patient (using PLWD Density instead of Word Ratio)
-        for patient in unique_patients:
-            patient_data = df_metrics[df_metrics["Patient ID"] == patient].sort_values("Week")
-            
-            # Add trace for the spiral path
-            fig_spiral.add_trace(
-                go.Scatterpolar(
-                    r=patient_data["PLWD Density"],
-                    theta=patient_data["Week"] * 90,  # Scale for better visualization
-                    mode="lines+markers",
-                    name=patient,
-                    line=dict(color=color_map[patient], width=2),
-                    marker=dict(size=8, color=color_map[patient]),
-                    customdata=np.stack((patient_data["Week"], 
-                                        patient_data["PLWD Density"], 
-                                        patient_data["Filename"]), axis=-1),
-                    hovertemplate="<b>Patient ID:</b> %{fullData.name}<br>" +
-                                 "<b>Week:</b> %{customdata[0]}<br>" +
-                                 "<b>PLWD Density:</b> %{customdata[1]:.1f}<br>" +
-                                 "<b>Filename:</b> %{customdata[2]}<br>"
-                )
+        # Add trace for the spiral path
+        fig_spiral.add_trace(
+            polar_trace(
+                r=patient_data["PLWD Density"],
+                theta=patient_data["Week"] * 90,  # Scale for better visualization
+                mode="lines+markers",
+                name=patient,
+                line=dict(color=color_map[patient], width=2),
+                marker=dict(size=8, color=color_map[patient]),
+                customdata=patient_data[["Week", "PLWD Density", "Filename"]].to_numpy(),
+                hovertemplate="<b>Patient ID:</b> %{fullData.name}<br>" +
+                             "<b>Week:</b> %{customdata[0]}<br>" +
+                             "<b>PLWD Density:</b> %{customdata[1]:.1f}<br>" +
+                             "<b>Filename:</b> %{customdata[2]}<br>"
             )
-        
-        # Update layout for better visualization
-        fig_spiral.update_layout(
-            title="PLWD Speech Density - Radial Spiral Timeline",
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, max(df_metrics["PLWD Density"].max() * 1.1, 10)],
-                    title="PLWD Density (Words per Turn)",
-                    tickfont=dict(size=10),
-                ),
-                angularaxis=dict(
-                    visible=True,
-                    tickmode="array",
-                    tickvals=[0, 90, 180, 270, 360],
-                    ticktext=["Week 0", "Week 1", "Week 2", "Week 3", "Week 4"],
-                    direction="clockwise",
-                    tickfont=dict(size=10),
-                )
-            ),
-            showlegend=True,
-            legend=dict(title="Patient ID"),
-            height=600,
-            margin=dict(t=100)
         )
-        
-        # Add animation frames
+    
+    # Update layout for better visualization
+    fig_spiral.update_layout(
+        title="PLWD Speech Density - Radial Spiral Timeline",
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, max(df_metrics["PLWD Density"].max() * 1.1, 10)],
+                title="PLWD Density (Words per Turn)",
+                tickfont=dict(size=10),
+            ),
+            angularaxis=dict(
+                visible=True,
+                tickmode="array",
+                tickvals=[0, 90, 180, 270, 360],
+                ticktext=["Week 0", "Week 1", "Week 2", "Week 3", "Week 4"],
+                direction="clockwise",
+                tickfont=dict(size=10),
+            )
+        ),
+        showlegend=True,
+        legend=dict(title="Patient ID"),
+        height=600,
+        margin=dict(t=100)
+    )
+    
+    # Animation frames add a full set of traces per week to the figure, so they are opt-in
+    if animate:
         frames = []
         for week in sorted(df_metrics["Week"].unique()):
             frame_data = []
             for patient in unique_patients:
-                patient_data = df_metrics[(df_metrics["Patient ID"] == patient) & 
-                                         (df_metrics["Week"] <= week)].sort_values("Week")
-                if not patient_data.empty:
+                # Each patient's points up to this week are a prefix of its sorted arrays
+                weeks, densities = patient_series[patient]
+                count = np.searchsorted(weeks, week, side="right")
+                if count:
                     frame_data.append(
-                        go.Scatterpolar(
-                            r=patient_data["PLWD Density"],
-                            theta=patient_data["Week"] * 90,
+                        polar_trace(
+                            r=densities[:count],
+                            theta=weeks[:count] * 90,
                             mode="lines+markers",
                             line=dict(color=color_map[patient], width=2),
                             marker=dict(size=8, color=color_map[patient])
@@ -280,63 +394,132 @@ def main():
                 )
             ]
         )
+    return fig_spiral
+
+def density_figure(df_metrics):
+    """Build the caregiver vs PLWD words-per-turn bar chart."""
+    # Wide-form bar: one trace per density column, no melted copy of the frame
+    return px.bar(df_metrics, x='Patient ID', y=['Caregiver Density', 'PLWD Density'], barmode='group',
+                  title="Speech Complexity: Words per Turn",
+                  labels={"value": "Average Words per Turn", "variable": "Speaker", "Patient ID": "Participant ID"})
+
+def scatter_figure(df_metrics):
+    """Build the question-word ratio vs PLWD density scatter plot."""
+    return px.scatter(df_metrics, x="Question-Word Ratio", y='PLWD Density', color='Patient ID', 
+                      size='Total Words', size_max=50,
+                      title="Engagement vs Speech Complexity",
+                      labels={
+                          "Question-Word Ratio": "Questions / Total Words", 
+                          "PLWD Density": "PLWD Words per Turn"
+                      },
+                      hover_data=["Session Type", "Week", "Condition"])
+
+def condition_figure(df_metrics, metric_to_plot):
+    """Build the average-by-condition bar chart for one metric, or None if there is nothing to plot."""
+    # Group by Condition and calculate mean of the selected metric
+    condition_grouped_metric = df_metrics.groupby("Condition", observed=True)[metric_to_plot].mean().reset_index()
+    if condition_grouped_metric.empty:
+        return None
+    
+    return px.bar(
+        condition_grouped_metric,
+        x="Condition",
+        y=metric_to_plot,
+        color="Condition",
+        title=f"Average {metric_to_plot} by Condition Type",
+        labels={metric_to_plot: f"Average {metric_to_plot}"}
+    )
+
+@st.cache_resource
+def build_overview_figure(filters, metric_to_plot):
+    """Combine the words-per-turn, engagement and by-condition charts into one 1x3 figure.
+    
+    The by-condition panel is left empty when there is no condition data.
+    """
+    df_metrics = _filtered_chart_metrics(filters)
+    panels = [
+        (density_figure(df_metrics), "Speaker"),
+        (scatter_figure(df_metrics), "Participant"),
+        (condition_figure(df_metrics, metric_to_plot), "Condition"),
+    ]
+    
+    fig = make_subplots(rows=1, cols=3, subplot_titles=[panel.layout.title.text if panel is not None else ""
+                                                        for panel, _ in panels])
+    for col, (panel, legend_title) in enumerate(panels, start=1):
+        if panel is None:
+            continue
+        # One legend group per panel so the entries stay grouped under a heading
+        for trace in panel.data:
+            trace.update(legendgroup=legend_title, legendgrouptitle_text=legend_title)
+            fig.add_trace(trace, row=1, col=col)
+        fig.update_xaxes(title_text=panel.layout.xaxis.title.text, row=1, col=col)
+        fig.update_yaxes(title_text=panel.layout.yaxis.title.text, row=1, col=col)
+    
+    # Each condition bar has its own x position, so they share one offset group
+    # instead of being narrowed into side-by-side slots by the grouped bar mode
+    fig.update_traces(offsetgroup="condition", selector=dict(legendgroup="Condition"))
+    fig.update_layout(barmode="group", height=550, legend=dict(groupclick="toggleitem"))
+    return fig
+
+# Main function for Streamlit page
+def main():
+    st.title("Lexical Diversity Analysis")
+    
+    # Get filter options (computed once, excluding Final Interview files)
+    all_patients, all_sessions, all_conditions = load_filter_options()
+    
+    # Create filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_patients = st.multiselect("Select Participant(s)", options=all_patients, default=all_patients)
+    with col2:
+        selected_sessions = st.multiselect("Select Session Type(s)", options=all_sessions, default=all_sessions)
+    with col3:
+        selected_conditions = st.multiselect("Select Condition(s)", options=all_conditions, default=all_conditions)
+    
+    # Lexical metrics for all files, then apply filters (an empty selection means no filter)
+    df_all = compute_all_metrics()
+    if df_all.empty:
+        st.warning("No lexical data available for selected filters.")
+        return
+    
+    df_metrics = filter_metrics(df_all, selected_patients, selected_sessions, selected_conditions)
+    
+    if df_metrics.empty:
+        st.warning("No lexical data available for selected filters.")
+        return
+    
+    # Display summary metrics
+    st.subheader("Lexical Diversity Metrics Summary")
+    # Add "Condition" to the displayed columns (removed Word Ratio)
+    display_df_metrics = df_metrics[["Patient ID", "Session Type", "Week", "Condition", "Filename", "Caregiver Density", "PLWD Density", "Question-Word Ratio", "Total Words"]].copy()
+    # Format through column config instead of a Styler; the columns stay numeric so they sort by value
+    st.dataframe(display_df_metrics, column_config={
+        "Caregiver Density": st.column_config.NumberColumn(format="%.1f"),
+        "PLWD Density": st.column_config.NumberColumn(format="%.1f"),
+        "Question-Word Ratio": st.column_config.NumberColumn(format="%.3f"),
+        "Total Words": st.column_config.NumberColumn(format="localized"),
+    })
+    
+    # Interactive Visualizations with Plotly
+    st.subheader("Interactive Visualizations")
+    
+    # 1. Word Ratio Trend Over Weeks - Radial Spiral Timeline
+    if not df_metrics.empty:
+        filters = (tuple(selected_patients), tuple(selected_sessions), tuple(selected_conditions))
         
-        st.plotly_chart(fig_spiral, use_container_width=True)
+        # Animation frames add a full set of traces per week to the figure, so they are opt-in
+        animate = st.checkbox("Enable animation", False)
+        st.plotly_chart(build_spiral_figure(filters, animate), use_container_width=True)
         
-        # 2. Bar Chart for Word Density Comparison
-        density_df = df_metrics.melt(
-            id_vars=["Patient ID", "Session Type", "Week"],
-            value_vars=["Caregiver Density", "PLWD Density"],
-            var_name="Speaker", value_name="Words per Turn"
+        # 2-4. Word density, engagement and by-condition charts, rendered as one figure
+        metric_to_plot = st.selectbox(
+            "Select metric to compare by condition:",
+            options=["PLWD Density", "Caregiver Density", "Question-Word Ratio"],
+            index=0,
+            key="lexical_metric_condition_selector"
         )
-        
-        fig_density = px.bar(density_df, x='Patient ID', y='Words per Turn', color='Speaker', barmode='group',
-                           title="Speech Complexity: Words per Turn",
-                           labels={"Words per Turn": "Average Words per Turn", "Patient ID": "Participant ID"})
-        st.plotly_chart(fig_density)
-        
-        # 3. Scatter Plot for Question-Word Ratio vs PLWD Density
-        fig_scatter = px.scatter(df_metrics, x="Question-Word Ratio", y='PLWD Density', color='Patient ID', 
-                                 size='Total Words', size_max=50,
-                                 title="Engagement vs Speech Complexity",
-                                 labels={
-                                     "Question-Word Ratio": "Questions / Total Words", 
-                                     "PLWD Density": "PLWD Words per Turn"
-                                 },
-                                 hover_data=["Session Type", "Week", "Condition"])
-        st.plotly_chart(fig_scatter)
-        
-        # 4. Heatmap of Word Ratio by Week and Patient
-       
-        # --- NEW: Interactive Chart for Lexical Metric by Condition ---
-        st.subheader("Lexical Metrics by Condition")
-        if not df_metrics.empty and "Condition" in df_metrics.columns:
-            # Select a metric to display
-            metric_to_plot = st.selectbox(
-                "Select metric to compare by condition:",
-                options=["PLWD Density", "Caregiver Density", "Question-Word Ratio"],
-                index=0,
-                key="lexical_metric_condition_selector"
-            )
-
-            if metric_to_plot:
-                # Group by Condition and calculate mean of the selected metric
-                condition_grouped_metric = df_metrics.groupby("Condition")[metric_to_plot].mean().reset_index()
-                
-                if not condition_grouped_metric.empty:
-                    fig_metric_by_condition = px.bar(
-                        condition_grouped_metric,
-                        x="Condition",
-                        y=metric_to_plot,
-                        color="Condition",
-                        title=f"Average {metric_to_plot} by Condition Type",
-                        labels={metric_to_plot: f"Average {metric_to_plot}"}
-                    )
-                    st.plotly_chart(fig_metric_by_condition, use_container_width=True)
-                else:
-                    st.info(f"No data to display for {metric_to_plot} by condition.")
-        else:
-            st.info("No condition data available to generate this chart.")
+        st.plotly_chart(build_overview_figure(filters, metric_to_plot), use_container_width=True)
 
     
     # Add interpretive text
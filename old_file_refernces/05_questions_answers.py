@@ -1,10 +1,9 @@
 import streamlit as st
 import pandas as pd
-import json
+import orjson
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from collections import defaultdict
 
 # --- Paths to your JSON files ---
 CLASSIFIED_PATH = "classified_output_1.json"
@@ -13,21 +12,60 @@ ENHANCED_ANALYSIS_PATH = "enhanced_transcript_analysis.json"
 
 @st.cache_data
 def load_json(path):
-    with open(path, encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
 
-def extract_qa_data(selected_patients, selected_sessions, selected_conditions):
-    # Load data
+@st.cache_data
+def load_filter_options():
+    """Return sorted (patients, sessions, conditions) tuples for the filter widgets.
+    
+    Final Interview files are left out of the options.
+    """
     classified = load_json(CLASSIFIED_PATH)
-    enriched = load_json(ENRICHED_PATH)
-    enhanced = load_json(ENHANCED_ANALYSIS_PATH)
+    non_final_classified = [f for f in classified if not f.get("final_interview", False) 
+                           and f.get("session_type", "") != "Final Interview"]
+    all_patients = tuple(sorted({f["patient_id"] for f in non_final_classified if f.get("patient_id")}))
+    all_sessions = tuple(sorted({f["session_type"] for f in non_final_classified if f.get("session_type")}))
+    all_conditions = tuple(sorted({f.get("condition_value", "").strip() for f in non_final_classified if f.get("condition_value")}))
+    return all_patients, all_sessions, all_conditions
+
+@st.cache_data
+def _classified_index():
+    """Map each filename to its classified metadata."""
+    return {f['filename']: f for f in load_json(CLASSIFIED_PATH)}
+
+@st.cache_data
+def _turn_word_index():
+    """Map each (patient_id, filename) to its basic statistics from the enriched insights.
+    
+    If a file appears under several session categories the first one wins.
+    """
+    turn_word_index = {}
+    for patient_id, categories in load_json(ENRICHED_PATH).items():
+        for session_category in categories.values():
+            for filename, file_data in session_category.items():
+                if "basic_statistics" in file_data and (patient_id, filename) not in turn_word_index:
+                    turn_word_index[(patient_id, filename)] = file_data["basic_statistics"]
+    return turn_word_index
+
+# Columns of the long examples table, one row per question or response turn
+EXAMPLE_COLUMNS = ["patient_id", "filename", "week", "session_type", "condition", "speaker", "text", "type"]
+
+@st.cache_data
+def _build_base_qa():
+    """Build the unfiltered per-file Q&A table and the long table of examples.
     
-    # Create a mapping of filenames to metadata from classified_data
-    filename_to_metadata = {f['filename']: f for f in classified}
+    Cached so the turns are only walked once; extract_qa_data filters the result.
+    """
+    # Load data
+    filename_to_metadata = _classified_index()
+    filename_to_turn_words = _turn_word_index()
+    enhanced = load_json(ENHANCED_ANALYSIS_PATH)
     
     # Initialize data structures
     qa_rows = []
-    examples_by_week = defaultdict(list)
+    file_metadata = []
+    file_turns = []
     
     # Process enhanced transcript analysis data for questions and answers
     for filename, file_data in enhanced.get("by_file", {}).items():
@@ -45,123 +83,224 @@ def extract_qa_data(selected_patients, selected_sessions, selected_conditions):
         condition_value = metadata.get('condition_value', '').strip()
         week = metadata.get('week', 'Unknown')
         
-        # Apply filters
-        if (selected_patients and patient_id not in selected_patients) or \
-           (selected_sessions and session_type not in selected_sessions) or \
-           (selected_conditions and condition_value not in selected_conditions):
-            continue
-        
         # Get statistics from file data
         stats = file_data.get("stats", {})
         
         # Get turn counts and word counts from transcript_insights_updated.json
-        turn_word_data = {}
-        if patient_id in enriched:
-            for session_category in enriched[patient_id].values():
-                if filename in session_category and "basic_statistics" in session_category[filename]:
-                    turn_word_data = session_category[filename]["basic_statistics"]
-                    break
+        turn_word_data = filename_to_turn_words.get((patient_id, filename), {})
         
-        # Extract questions counts
-        caregiver_questions = 0
-        plwd_questions = 0
-        question_examples = []
-        
-        # Extract questions and examples from turns data
-        for turn in file_data.get("turns", []):
-            speaker = turn.get("speaker", "unknown")
-            is_question = turn.get("is_question", False)
-            is_response = turn.get("is_response", False)
-            
-            if is_question:
-                if speaker == "caregiver":
-                    caregiver_questions += 1
-                elif speaker == "plwd":
-                    plwd_questions += 1
-                
-                # Store this as a question example
-                question_example = {
-                    "patient_id": patient_id,
-                    "filename": filename,
-                    "week": week,
-                    "session_type": session_type,
-                    "condition": condition_value,
-                    "speaker": speaker,
-                    "text": turn.get("text", ""),
-                    "type": "question"
-                }
-                question_examples.append(question_example)
-                examples_by_week[week].append(question_example)
-            
-            # Also track responses separately
-            if is_response:
-                # Store this as a response example
-                response_example = {
-                    "patient_id": patient_id,
-                    "filename": filename,
-                    "week": week,
-                    "session_type": session_type,
-                    "condition": condition_value,
-                    "speaker": speaker,
-                    "text": turn.get("text", ""),
-                    "type": "response"
-                }
-                examples_by_week[week].append(response_example)
-        
-        # Calculate total questions and question balance metrics
-        total_questions = caregiver_questions + plwd_questions
-        
-        # Calculate a question balance metric that works well with zeros
-        if caregiver_questions == 0 and plwd_questions == 0:
-            # If both are zero, balance is neutral (0.5)
-            answer_ratio = 0.5
-        elif caregiver_questions == 0:
-            # If only caregiver questions is zero, balance is high (0.9)
-            answer_ratio = 0.9
-        elif plwd_questions == 0:
-            # If only PLWD questions is zero, balance is low (0.1)
-            answer_ratio = 0.1
-        else:
-            # Otherwise, normalize to a 0.1-0.9 range
-            raw_ratio = plwd_questions / (caregiver_questions + plwd_questions)
-            answer_ratio = 0.1 + (raw_ratio * 0.8)  # Scale to 0.1-0.9 range
-        
-        # Create row for dataframe
+        # Create row for dataframe; question counts are added from the turns table below
         qa_rows.append({
             "Patient ID": patient_id,
             "Session Type": session_type,
             "Week": week,
             "Filename": filename,
             "Condition": condition_value,
-            "Caregiver Questions": caregiver_questions,
-            "PLWD Questions": plwd_questions,
-            "Total Questions": total_questions,
-            "Answer Ratio": answer_ratio,
             "Caregiver Turns": turn_word_data.get("caregiver_turns", 0),
             "PLWD Turns": turn_word_data.get("plwd_turns", 0),
             "Caregiver Words": turn_word_data.get("caregiver_words", 0),
             "PLWD Words": turn_word_data.get("plwd_words", 0)
         })
+        file_metadata.append((filename, patient_id, week, session_type, condition_value))
+        
+        # Turns are flattened into one table below; questions and responses are counted in bulk
+        file_turns.append({"filename": filename, "turns": file_data.get("turns", [])})
+    
+    base_qa_df = pd.DataFrame(qa_rows)
+    if base_qa_df.empty:
+        return base_qa_df, pd.DataFrame(columns=EXAMPLE_COLUMNS, dtype=object)
+    
+    # One row per turn, keeping only the fields used here (max_level=0 leaves nested
+    # turn fields unflattened); missing fields get the old .get() defaults
+    turns_df = pd.json_normalize(file_turns, record_path="turns", max_level=0)
+    # The file of each turn is set by position, so a turn's own "filename" field cannot clash with it
+    turns_df["filename"] = np.repeat(
+        [ft["filename"] for ft in file_turns], [len(ft["turns"]) for ft in file_turns]
+    )
+    turns_df = turns_df.reindex(columns=["filename", "speaker", "is_question", "is_response", "text"])
+    turns_df = turns_df.fillna({"speaker": "unknown", "is_question": False, "is_response": False, "text": ""})
+    turns_df = turns_df.astype({"is_question": bool, "is_response": bool})
+    
+    # Count questions per file by speaker
+    question_counts = turns_df.groupby(["filename", "speaker"])["is_question"].sum().unstack(fill_value=0)
+    question_counts = question_counts.reindex(columns=["caregiver", "plwd"], fill_value=0)
+    question_counts = question_counts.reindex(base_qa_df["Filename"], fill_value=0)
+    caregiver_questions = question_counts["caregiver"].to_numpy()
+    plwd_questions = question_counts["plwd"].to_numpy()
+    
+    total_questions = caregiver_questions + plwd_questions
+    
+    # Question balance on a 0.1-0.9 scale that works well with zeros: neutral (0.5) when
+    # both are zero, high (0.9) or low (0.1) when only one side asks, otherwise the PLWD
+    # share of the questions scaled to the 0.1-0.9 range
+    raw_ratio = np.divide(plwd_questions, total_questions, out=np.zeros(len(total_questions)), where=total_questions > 0)
+    answer_ratio = np.select(
+        [total_questions == 0, caregiver_questions == 0, plwd_questions == 0],
+        [0.5, 0.9, 0.1],
+        default=0.1 + raw_ratio * 0.8
+    )
+    
+    base_qa_df.insert(5, "Caregiver Questions", caregiver_questions)
+    base_qa_df.insert(6, "PLWD Questions", plwd_questions)
+    base_qa_df.insert(7, "Total Questions", total_questions)
+    base_qa_df.insert(8, "Answer Ratio", answer_ratio)
+    
+    # Question rates (questions per 100 words), computed once for the whole dataset
+    caregiver_words = base_qa_df["Caregiver Words"].to_numpy()
+    plwd_words = base_qa_df["PLWD Words"].to_numpy()
+    base_qa_df["Caregiver Question Rate"] = np.round(caregiver_questions / (caregiver_words + 1e-9) * 100, 2)
+    base_qa_df["PLWD Question Rate"] = np.round(plwd_questions / (plwd_words + 1e-9) * 100, 2)
+    base_qa_df["Overall Question Rate"] = np.round(total_questions / (caregiver_words + plwd_words + 1e-9) * 100, 2)
+    
+    # Categorical ID columns: cheaper to filter, group and sort than object strings
+    for col in ("Patient ID", "Session Type", "Condition"):
+        base_qa_df[col] = base_qa_df[col].astype("category")
+    
+    # Question and response examples in turn order (a question before the response of the
+    # same turn), with the metadata of their file; object dtype keeps the raw week values
+    examples = pd.concat([
+        turns_df[turns_df["is_question"]].assign(type="question"),
+        turns_df[turns_df["is_response"]].assign(type="response"),
+    ]).sort_index(kind="stable")
+    file_metadata = pd.DataFrame(
+        file_metadata, columns=["filename", "patient_id", "week", "session_type", "condition"], dtype=object
+    ).set_index("filename")
+    examples_df = examples.join(file_metadata, on="filename")[EXAMPLE_COLUMNS]
+    
+    return base_qa_df, examples_df
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def extract_qa_data(selected_patients, selected_sessions, selected_conditions):
+    base_qa_df, examples_df = _build_base_qa()
+    if base_qa_df.empty:
+        return base_qa_df, examples_df
+    
+    # Apply filters (an empty selection means no filter); a column whose every value
+    # is selected (the multiselect default) rejects nothing and is not masked
+    mask = None
+    for column, selected in (
+        ("Patient ID", selected_patients),
+        ("Session Type", selected_sessions),
+        ("Condition", selected_conditions),
+    ):
+        if not selected:
+            continue
+        values = base_qa_df[column]
+        if not values.hasnans and set(values.cat.categories) <= set(selected):
+            continue
+        column_mask = values.isin(selected).to_numpy()
+        mask = column_mask if mask is None else mask & column_mask
     
-    # Create DataFrame
-    qa_df = pd.DataFrame(qa_rows)
+    if mask is None:
+        return base_qa_df, examples_df
+    qa_df = base_qa_df[mask].reset_index(drop=True)
     
-    return qa_df, examples_by_week
+    # Examples of the selected files
+    selected_examples = examples_df[examples_df["filename"].isin(qa_df["Filename"])].reset_index(drop=True)
+    
+    return qa_df, selected_examples
 
-def main():
-    st.title("Questions & Answers Analysis")
+def prepare_qa_data(qa_df):
+    """Add the numeric Week and the Week Label to a Q&A table."""
+    # Convert Week to numeric for proper sorting and grouping
+    qa_df["Week"] = pd.to_numeric(qa_df["Week"], errors="coerce")
+    
+    # Create week label for display purposes
+    qa_df["Week Label"] = qa_df["Week"].apply(
+        lambda w: "Final" if pd.isna(w) else f"Week {int(w)}"
+    ).astype("category")
+    return qa_df
 
-    # Load data
-    classified = load_json(CLASSIFIED_PATH)
+@st.cache_data
+def _qa_aggregates(selected_patients, selected_sessions, selected_conditions):
+    """Return the summary table and the chart aggregates for a filter selection.
     
-    # Filter out Final Interview files from filter options
-    non_final_classified = [f for f in classified if not f.get("final_interview", False) 
-                           and f.get("session_type", "") != "Final Interview"]
+    The selections are tuples so reruns with an unchanged selection hit the cache.
+    """
+    qa_df, _ = extract_qa_data(selected_patients, selected_sessions, selected_conditions)
+    qa_df = prepare_qa_data(qa_df)
+    
+    # Group by week and calculate statistics with Condition included
+    # (file counts come from the group sizes rather than a generic "count" aggregation)
+    week_condition_groups = qa_df.groupby(["Week Label", "Condition"], observed=True)
+    summary_df = week_condition_groups.agg({
+        "Caregiver Questions": "sum",
+        "PLWD Questions": "sum",
+        "Total Questions": "sum",
+        "Caregiver Words": "sum",
+        "PLWD Words": "sum",
+        "Patient ID": "nunique"
+    }).assign(**{"File Count": week_condition_groups.size()}).reset_index()
     
-    # Get filter options
-    all_patients = sorted(set(f["patient_id"] for f in non_final_classified if f.get("patient_id")))
-    all_sessions = sorted(set(f["session_type"] for f in non_final_classified if f.get("session_type")))
-    all_conditions = sorted(list(set(f.get("condition_value", "").strip() for f in non_final_classified if f.get("condition_value"))))
+    # Rename columns for clarity
+    summary_df = summary_df.rename(columns={
+        "Patient ID": "Unique Patients"
+    })
+    
+    # Calculate percentages and rates (questions per 100 words)
+    summary_df["Caregiver %"] = (summary_df["Caregiver Questions"] / (summary_df["Total Questions"] + 1e-9) * 100).round(1)
+    summary_df["PLWD %"] = (summary_df["PLWD Questions"] / (summary_df["Total Questions"] + 1e-9) * 100).round(1)
+    summary_df["Caregiver Question Rate"] = (summary_df["Caregiver Questions"] / (summary_df["Caregiver Words"] + 1e-9) * 100).round(2)
+    summary_df["PLWD Question Rate"] = (summary_df["PLWD Questions"] / (summary_df["PLWD Words"] + 1e-9) * 100).round(2)
+    
+    # Calculate question balance ratio (normalized between 0-1)
+    balance = qa_df["PLWD Questions"] / (qa_df["Total Questions"] + 1e-9)
+    
+    # Group by patient and calculate average balance ratio
+    patient_balance = balance.groupby(qa_df["Patient ID"], observed=True).mean().reset_index(name="Balance Ratio")
+    
+    # Group by week and calculate average questions per session
+    week_groups = qa_df.groupby("Week Label", observed=True)
+    weekly_avg = week_groups.agg({
+        "Caregiver Questions": "mean",
+        "PLWD Questions": "mean"
+    }).assign(**{"Session Count": week_groups.size()}).reset_index()
+    
+    # Ensure proper week order
+    week_order = sorted([w for w in weekly_avg["Week Label"].unique() if w != "Final"]) + ["Final"]
+    weekly_avg["Week Order"] = pd.Categorical(weekly_avg["Week Label"], categories=week_order, ordered=True)
+    weekly_avg = weekly_avg.sort_values("Week Order")
+    
+    # Create pivot table for heatmap
+    ratio_pivot = qa_df.pivot_table(
+        index="Patient ID",
+        columns="Week Label",
+        values="Answer Ratio",
+        aggfunc="mean",
+        observed=True
+    ).fillna(0)
+    
+    # Group by patient
+    patient_engagement = qa_df.groupby("Patient ID", observed=True).agg({
+        "Caregiver Questions": "sum",
+        "PLWD Questions": "sum",
+        "Total Questions": "sum"
+    }).reset_index()
+    
+    # Calculate engagement metrics
+    patient_engagement["Engagement Index"] = (
+        (patient_engagement["PLWD Questions"] / (patient_engagement["Total Questions"] + 1e-9)) * 
+        np.log1p(patient_engagement["Total Questions"])
+    ).round(2)
+    
+    # Sort by engagement index
+    patient_engagement = patient_engagement.sort_values("Engagement Index", ascending=False)
+    
+    return summary_df, patient_balance, weekly_avg, ratio_pivot, patient_engagement
+
+def examples_markdown(examples):
+    """Render a block of Q&A examples as one markdown string, separated by horizontal rules."""
+    return "\n\n---\n\n".join(
+        f"{idx+1}. {'**Caregiver**' if example.speaker == 'caregiver' else '**PLWD**'}: {example.text}\n\n"
+        f"   - Session: {example.session_type}, Condition: {example.condition}"
+        for idx, example in enumerate(examples.itertuples(index=False))
+    )
+
+def main():
+    st.title("Questions & Answers Analysis")
+
+    # Get filter options (computed once, excluding Final Interview files)
+    all_patients, all_sessions, all_conditions = load_filter_options()
     
     # Create filters - keep them on the main page, not in sidebar
     col1, col2, col3 = st.columns(3)
@@ -173,7 +312,8 @@ def main():
         selected_conditions = st.multiselect("Select Condition(s)", options=all_conditions, default=all_conditions)
     
     # Extract questions and answers data
-    qa_df, examples_by_week = extract_qa_data(selected_patients, selected_sessions, selected_conditions)
+    # Tuples so the selections can key the cache
+    qa_df, examples_df = extract_qa_data(tuple(selected_patients), tuple(selected_sessions), tuple(selected_conditions))
     
     if qa_df.empty:
         st.warning("No questions and answers data available for selected filters.")
@@ -187,21 +327,13 @@ def main():
     
     # --- Data Preparation ---
     
-    # Convert Week to numeric for proper sorting and grouping
-    qa_df["Week"] = pd.to_numeric(qa_df["Week"], errors="coerce")
+    qa_df = prepare_qa_data(qa_df)
     
-    # Create week label for display purposes
-    qa_df["Week Label"] = qa_df["Week"].apply(
-        lambda w: "Final" if pd.isna(w) else f"Week {int(w)}"
+    # Aggregations are cached per filter selection
+    summary_df, patient_balance, weekly_avg, ratio_pivot, patient_engagement = _qa_aggregates(
+        tuple(selected_patients), tuple(selected_sessions), tuple(selected_conditions)
     )
     
-    # Calculate question rates (questions per 100 words)
-    if not qa_df.empty:
-        qa_df['Caregiver Question Rate'] = (qa_df['Caregiver Questions'] / (qa_df['Caregiver Words'] + 1e-9) * 100).round(2)
-        qa_df['PLWD Question Rate'] = (qa_df['PLWD Questions'] / (qa_df['PLWD Words'] + 1e-9) * 100).round(2)
-        qa_df['Overall Question Rate'] = ((qa_df['Caregiver Questions'] + qa_df['PLWD Questions']) / 
-                                         (qa_df['Caregiver Words'] + qa_df['PLWD Words'] + 1e-9) * 100).round(2)
-    
     # --- Display detailed table ---
     st.subheader("Detailed Questions & Answers Statistics by File")
     
@@ -213,12 +345,15 @@ def main():
         'Caregiver Question Rate', 'PLWD Question Rate', 'Overall Question Rate'
     ]
     
-    # Sort by Week and Patient ID for better readability
-    df_sorted = qa_df.sort_values(['Week', 'Patient ID']).fillna(0)
+    # Sort by Week and Patient ID for better readability; only the displayed columns
+    # go through the Styler
+    view = qa_df.sort_values(['Week', 'Patient ID']).loc[:, display_columns].reset_index(drop=True)
+    numeric_columns = view.select_dtypes("number").columns
+    view[numeric_columns] = view[numeric_columns].fillna(0)
     
     # Format the table with styling
     st.dataframe(
-        df_sorted[display_columns].style
+        view.style
         .format({
             'Caregiver Question Rate': '{:.2f}%',
             'PLWD Question Rate': '{:.2f}%',
@@ -231,29 +366,6 @@ def main():
     # --- Summary Table ---
     st.subheader("Questions & Answers Summary by Week")
     
-    # Group by week and calculate statistics with Condition included
-    summary_df = qa_df.groupby(["Week Label", "Condition"]).agg({
-        "Caregiver Questions": "sum",
-        "PLWD Questions": "sum",
-        "Total Questions": "sum",
-        "Caregiver Words": "sum",
-        "PLWD Words": "sum",
-        "Patient ID": "nunique",
-        "Filename": "count"
-    }).reset_index()
-    
-    # Rename columns for clarity
-    summary_df = summary_df.rename(columns={
-        "Patient ID": "Unique Patients",
-        "Filename": "File Count"
-    })
-    
-    # Calculate percentages and rates (questions per 100 words)
-    summary_df["Caregiver %"] = (summary_df["Caregiver Questions"] / (summary_df["Total Questions"] + 1e-9) * 100).round(1)
-    summary_df["PLWD %"] = (summary_df["PLWD Questions"] / (summary_df["Total Questions"] + 1e-9) * 100).round(1)
-    summary_df["Caregiver Question Rate"] = (summary_df["Caregiver Questions"] / (summary_df["Caregiver Words"] + 1e-9) * 100).round(2)
-    summary_df["PLWD Question Rate"] = (summary_df["PLWD Questions"] / (summary_df["PLWD Words"] + 1e-9) * 100).round(2)
-    
     # Display summary table
     st.dataframe(
         summary_df.style
@@ -271,15 +383,6 @@ def main():
     
     st.subheader("Question Balance by Participant")
     
-    # Prepare data for radar chart
-    radar_df = qa_df.copy()
-    
-    # Calculate question balance ratio (normalized between 0-1)
-    radar_df["Balance Ratio"] = radar_df["PLWD Questions"] / (radar_df["Total Questions"] + 1e-9)
-    
-    # Group by patient and calculate average balance ratio
-    patient_balance = radar_df.groupby("Patient ID")["Balance Ratio"].mean().reset_index()
-    
     # Create radar chart
     fig1 = px.line_polar(
         patient_balance,
@@ -307,23 +410,6 @@ def main():
     
     st.subheader("Question Trends Over Time")
     
-    # Prepare data for trend visualization
-    # Convert Week to numeric for proper sorting
-    trend_df = qa_df.copy()
-    
-    # Group by week and calculate average questions per session
-    weekly_avg = trend_df.groupby("Week Label").agg({
-        "Caregiver Questions": "mean",
-        "PLWD Questions": "mean",
-        "Filename": "count"
-    }).reset_index()
-    weekly_avg.rename(columns={"Filename": "Session Count"}, inplace=True)
-    
-    # Ensure proper week order
-    week_order = sorted([w for w in weekly_avg["Week Label"].unique() if w != "Final"]) + ["Final"]
-    weekly_avg["Week Order"] = pd.Categorical(weekly_avg["Week Label"], categories=week_order, ordered=True)
-    weekly_avg = weekly_avg.sort_values("Week Order")
-    
     # Create a dual-axis chart for questions per session
     fig2 = go.Figure()
     
@@ -385,14 +471,6 @@ def main():
     # Create a heatmap showing question patterns across participants and weeks
     # Calculate question ratio (PLWD/Caregiver) for each patient and week
     if len(qa_df) > 3:
-        # Create pivot table for heatmap
-        ratio_pivot = qa_df.pivot_table(
-            index="Patient ID",
-            columns="Week Label",
-            values="Answer Ratio",
-            aggfunc="mean"
-        ).fillna(0)
-        
         # Create annotated heatmap
         fig3 = px.imshow(
             ratio_pivot,
@@ -439,14 +517,14 @@ def main():
     
     if not baseline_df.empty and not final_df.empty:
         # Aggregate data by patient
-        baseline_agg = baseline_df.groupby("Patient ID").agg({
+        baseline_agg = baseline_df.groupby("Patient ID", observed=True).agg({
             "Caregiver Questions": "sum",
             "PLWD Questions": "sum",
             "Total Questions": "sum"
         }).reset_index()
         baseline_agg["Period"] = "Baseline"
         
-        final_agg = final_df.groupby("Patient ID").agg({
+        final_agg = final_df.groupby("Patient ID", observed=True).agg({
             "Caregiver Questions": "sum",
             "PLWD Questions": "sum",
             "Total Questions": "sum"
@@ -473,7 +551,8 @@ def main():
             color_discrete_map={"Baseline": "#1E90FF", "Final": "#FF6347"},
             size_max=40,
             opacity=0.7,
-            template="plotly_white"
+            template="plotly_white",
+            render_mode="webgl"
         )
         
         # Add diagonal reference lines to each facet
@@ -544,22 +623,6 @@ def main():
     
     # Calculate an engagement index based on question patterns
     if not qa_df.empty:
-        # Group by patient
-        patient_engagement = qa_df.groupby("Patient ID").agg({
-            "Caregiver Questions": "sum",
-            "PLWD Questions": "sum",
-            "Total Questions": "sum"
-        }).reset_index()
-        
-        # Calculate engagement metrics
-        patient_engagement["Engagement Index"] = (
-            (patient_engagement["PLWD Questions"] / (patient_engagement["Total Questions"] + 1e-9)) * 
-            np.log1p(patient_engagement["Total Questions"])
-        ).round(2)
-        
-        # Sort by engagement index
-        patient_engagement = patient_engagement.sort_values("Engagement Index", ascending=False)
-        
         # Create horizontal bar chart
         fig5 = px.bar(
             patient_engagement,
@@ -615,35 +678,32 @@ def main():
         except (ValueError, TypeError):
             return str(item)  # Fall back to string comparison
     
+    # Examples by raw week value, in the order the weeks first appear (None for no week)
+    examples_by_week = {
+        None if pd.isna(week) else week: group
+        for week, group in examples_df.groupby("week", sort=False, dropna=False)
+    }
+    
     # Create expanders for each week
     for week in sorted(examples_by_week.keys(), key=safe_sort_key):
         week_label = "Final Interview" if week is None or pd.isna(week) else f"Week {int(week)}" if not pd.isna(week) else "Unknown"
         with st.expander(f"{week_label} Examples"):
-            if examples_by_week[week]:
+            week_examples = examples_by_week[week]
+            if not week_examples.empty:
                 # Group examples by type (question or response)
-                questions = [ex for ex in examples_by_week[week] if ex['type'] == 'question']
-                responses = [ex for ex in examples_by_week[week] if ex['type'] == 'response']
+                questions = week_examples[week_examples["type"] == "question"]
+                responses = week_examples[week_examples["type"] == "response"]
                 
                 # Display questions first
-                if questions:
-                    st.markdown("#### Questions")
-                    for idx, example in enumerate(questions[:15]):  # Limit to 15 examples
-                        speaker_bold = "**Caregiver**" if example['speaker'] == 'caregiver' else "**PLWD**"
-                        st.markdown(f"{idx+1}. {speaker_bold}: {example['text']}")
-                        st.markdown(f"   - Session: {example['session_type']}, Condition: {example['condition']}")
-                        st.divider()
+                if not questions.empty:
+                    st.markdown("#### Questions\n\n" + examples_markdown(questions.head(15)))  # Limit to 15 examples
                     
                     if len(questions) > 15:
                         st.info(f"{len(questions) - 15} more question examples not shown")
                 
                 # Then display responses
-                if responses:
-                    st.markdown("#### Responses")
-                    for idx, example in enumerate(responses[:15]):  # Limit to 15 examples
-                        speaker_bold = "**Caregiver**" if example['speaker'] == 'caregiver' else "**PLWD**"
-                        st.markdown(f"{idx+1}. {speaker_bold}: {example['text']}")
-                        st.markdown(f"   - Session: {example['session_type']}, Condition: {example['condition']}")
-                        st.divider()
+                if not responses.empty:
+                    st.markdown("#### Responses\n\n" + examples_markdown(responses.head(15)))  # Limit to 15 examples
                     
                     if len(responses) > 15:
                         st.info(f"{len(responses) - 15} more response examples not shown")
@@ -1,26 +1,28 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import json
+import orjson
 import plotly.express as px
-from collections import defaultdict
 
 # --- Loaders ---
 
+@st.cache_data(show_spinner=False)
 def load_classified_data(classified_json_path):
-    with open(classified_json_path, 'r', encoding='utf-8') as f:
-        classified_data = json.load(f)
+    with open(classified_json_path, 'rb') as f:
+        classified_data = orjson.loads(f.read())
     return classified_data
 
 
+@st.cache_data(show_spinner=False)
 def load_enriched_data(enriched_json_path):
-    with open(enriched_json_path, 'r', encoding='utf-8') as f:
-        enriched_data = json.load(f)
+    with open(enriched_json_path, 'rb') as f:
+        enriched_data = orjson.loads(f.read())
     return enriched_data
 
+@st.cache_data(show_spinner=False)
 def load_enhanced_analysis(enhanced_analysis_path):
-    with open(enhanced_analysis_path, 'r', encoding='utf-8') as f:
-        enhanced_data = json.load(f)
+    with open(enhanced_analysis_path, 'rb') as f:
+        enhanced_data = orjson.loads(f.read())
     return enhanced_data
 
 # --- Paths to your JSON files ---
@@ -28,188 +30,336 @@ CLASSIFIED_JSON_PATH = "classified_output_1.json"
 ENRICHED_JSON_PATH = "transcript_insights_updated.json"
 ENHANCED_ANALYSIS_PATH = "enhanced_transcript_analysis_fixed.json"  # Using cleaned/normalized data
 
-# --- Main Streamlit App for Non-verbal Analysis ---
+# Lowercase cue names that go to the "Extra" section instead of nonverbal cues
+EXTRA_CUES = frozenset({'inaudible', 'pause', 'interruption'})
 
-def main():
-    st.title("Nonverbal Communication Analysis")
+@st.cache_data(show_spinner=False)
+def prepare_classified(classified_json_path):
+    """Return the filename to metadata mapping and the sorted filter options.
     
-    # Display data quality note
-    st.info("📊 **Data Quality Improvements**: Non-verbal cues have been cleaned and normalized. "
-            "Language annotations (e.g., 'speaking Portuguese'), technical metadata, and variations "
-            "like '[inaudible]' vs 'inaudible' have been standardized for consistent analysis.")
-
-    classified_data = load_classified_data(CLASSIFIED_JSON_PATH)
-    enriched_data = load_enriched_data(ENRICHED_JSON_PATH)
-    enhanced_data = load_enhanced_analysis(ENHANCED_ANALYSIS_PATH)
-
-    if not classified_data or not enriched_data or not enhanced_data:
-        st.warning("One or more required data files could not be loaded.")
-        return
-
-    # Filter out Final Interview files
-    classified_data = [f for f in classified_data if not f.get("final_interview", False) 
+    Final Interview files are left out of both.
+    """
+    classified_data = [f for f in load_classified_data(classified_json_path) if not f.get("final_interview", False) 
                       and f.get("session_type", "") != "Final Interview"]
-
-    # Filters - kept on the main page (not in sidebar)
-    all_patients = sorted(set(f['patient_id'] for f in classified_data if f.get('patient_id')))
-    all_sessions = sorted(set(f['session_type'] for f in classified_data if f.get('session_type')))
-    # Normalize conditions for the filter options by stripping whitespace
-    all_conditions = sorted(list(set(f.get("condition_value", "").strip() for f in classified_data if f.get("condition_value"))))
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        selected_patients = st.multiselect("Select Participant(s)", options=all_patients, default=all_patients)
-    with col2:
-        selected_sessions = st.multiselect("Select Session Type(s)", options=all_sessions, default=all_sessions)
-    with col3:
-        selected_conditions = st.multiselect("Select Condition(s)", options=all_conditions, default=all_conditions)
-
+    
     # Create a filename to metadata mapping for quick lookups
     filename_to_metadata = {f['filename']: f for f in classified_data}
-
-    # Define categories for separation
-    EXTRA_CUES = {'inaudible', 'pause', 'interruption'}  # These will go to "Extra" section
     
-    # Prepare nonverbal analysis data
-    nonverbal_rows = []
-    extra_rows = []  # New section for inaudible, pause, interruption
-    example_data = defaultdict(list)
-    extra_example_data = defaultdict(list)
+    all_patients = tuple(sorted({f['patient_id'] for f in classified_data if f.get('patient_id')}))
+    all_sessions = tuple(sorted({f['session_type'] for f in classified_data if f.get('session_type')}))
+    # Normalize conditions for the filter options by stripping whitespace
+    all_conditions = tuple(sorted({f.get("condition_value", "").strip() for f in classified_data if f.get("condition_value")}))
+    return filename_to_metadata, all_patients, all_sessions, all_conditions
 
-    # Process enhanced transcript analysis data for nonverbal cues
-    for filename, file_data in enhanced_data.get("by_file", {}).items():
+@st.cache_data(show_spinner=False)
+def index_enriched(enriched_json_path):
+    """Map each (patient_id, filename) to its basic statistics from the enriched insights.
+    
+    If a file appears under several session categories the first one wins.
+    """
+    enriched_index = {}
+    for patient_id, categories in load_enriched_data(enriched_json_path).items():
+        for session_category in categories.values():
+            for filename, file_data in session_category.items():
+                if "basic_statistics" in file_data and (patient_id, filename) not in enriched_index:
+                    enriched_index[(patient_id, filename)] = file_data["basic_statistics"]
+    return enriched_index
+
+@st.cache_data(show_spinner=False)
+def resolve_file_metadata():
+    """Map each analysed file to its (patient_id, session_type, condition_value, week).
+    
+    Metadata stored with the file wins over the classified metadata.
+    """
+    filename_to_metadata = prepare_classified(CLASSIFIED_JSON_PATH)[0]
+    file_metadata_index = {}
+    for filename, file_data in load_enhanced_analysis(ENHANCED_ANALYSIS_PATH).get("by_file", {}).items():
         # Get metadata from classified data or from the file data itself
         metadata = file_data.get("metadata", {})
         if not metadata:
             metadata = filename_to_metadata.get(filename, {})
-            
-        patient_id = metadata.get('patient_id', 'Unknown')
-        session_type = metadata.get('session_type', 'Unknown')
-        condition_value = metadata.get('condition_value', '').strip()
-        week = metadata.get('week', 'Unknown')
-
-        # Apply filters
-        if selected_patients and patient_id not in selected_patients:
-            continue
-        if selected_sessions and session_type not in selected_sessions:
-            continue
-        if selected_conditions and condition_value not in selected_conditions:
-            continue
+        
+        file_metadata_index[filename] = (
+            metadata.get('patient_id', 'Unknown'),
+            metadata.get('session_type', 'Unknown'),
+            metadata.get('condition_value', '').strip(),
+            metadata.get('week', 'Unknown'),
+        )
+    return file_metadata_index
+
+@st.cache_data(show_spinner=False)
+def data_files_loaded():
+    """Return whether all three JSON files loaded with content."""
+    return bool(load_classified_data(CLASSIFIED_JSON_PATH) and load_enriched_data(ENRICHED_JSON_PATH)
+                and load_enhanced_analysis(ENHANCED_ANALYSIS_PATH))
+
+def word_rate(counts, words):
+    """Return counts per 100 words rounded to 2 places, 0 where there are no words."""
+    counts = np.asarray(counts, dtype=float)
+    words = np.asarray(words, dtype=float)
+    return np.round(np.divide(counts, words, out=np.zeros(len(words)), where=words > 0) * 100, 2)
+
+@st.cache_data(show_spinner=False)
+def build_tables(selected_patients, selected_sessions, selected_conditions):
+    """Return the nonverbal and extra tables and the cue examples table for a filter selection.
+    
+    The selections are tuples so reruns with an unchanged selection hit the cache.
+    """
+    # Basic statistics per (patient_id, filename)
+    enriched_index = index_enriched(ENRICHED_JSON_PATH)
+
+    # Prepare nonverbal analysis data
+    file_rows = []
+    file_metadata = []
+    file_turns = []
+    cue_type_counts = {}
+
+    # Apply filters on the resolved metadata first (an empty selection means no filter),
+    # so rejected files are never looked at
+    file_metadata_index = resolve_file_metadata()
+    patients, sessions, conditions = set(selected_patients), set(selected_sessions), set(selected_conditions)
+    selected_files = [
+        filename for filename, (patient_id, session_type, condition_value, _) in file_metadata_index.items()
+        if (not patients or patient_id in patients)
+        and (not sessions or session_type in sessions)
+        and (not conditions or condition_value in conditions)
+    ]
+
+    # Process enhanced transcript analysis data for nonverbal cues
+    by_file = load_enhanced_analysis(ENHANCED_ANALYSIS_PATH).get("by_file", {})
+    for filename in selected_files:
+        file_data = by_file[filename]
+        patient_id, session_type, condition_value, week = file_metadata_index[filename]
 
         # Get statistics from file data
         stats = file_data.get("stats", {})
         nonverbal_cue_counts = stats.get("nonverbal_cues", {})
 
-        # Initialize counters for nonverbal cues by speaker (excluding extras)
-        caregiver_nonverbal = 0
-        plwd_nonverbal = 0
-        
-        # Initialize counters for extra cues by speaker
-        caregiver_extra = 0
-        plwd_extra = 0
-        
         # Get turn counts and word counts from transcript_insights_updated.json
-        turn_word_data = {}
-        if patient_id in enriched_data:
-            for session_category in enriched_data[patient_id].values():
-                if filename in session_category and "basic_statistics" in session_category[filename]:
-                    turn_word_data = session_category[filename]["basic_statistics"]
-                    break
-        
-        # Extract examples and count nonverbal cues by speaker, separating extras
-        for turn in file_data.get("turns", []):
-            nonverbal_cues = turn.get("nonverbal_cues", [])
-            speaker = turn.get("speaker", "unknown")
-            
-            if nonverbal_cues:
-                # Separate nonverbal cues from extra cues
-                regular_cues = [cue for cue in nonverbal_cues if cue.lower() not in EXTRA_CUES]
-                extra_cues = [cue for cue in nonverbal_cues if cue.lower() in EXTRA_CUES]
-                
-                # Count regular nonverbal cues by speaker
-                if speaker == "caregiver":
-                    caregiver_nonverbal += len(regular_cues)
-                    caregiver_extra += len(extra_cues)
-                elif speaker == "plwd":
-                    plwd_nonverbal += len(regular_cues)
-                    plwd_extra += len(extra_cues)
-                
-                # Store examples for regular nonverbal cues
-                for cue in regular_cues:
-                    example = {
-                        "patient_id": patient_id,
-                        "filename": filename,
-                        "week": week,
-                        "session_type": session_type,
-                        "condition": condition_value,
-                        "speaker": speaker,
-                        "text": turn.get("text", ""),
-                        "nonverbal_cue": cue
-                    }
-                    example_data[week].append(example)
-                
-                # Store examples for extra cues
-                for cue in extra_cues:
-                    example = {
-                        "patient_id": patient_id,
-                        "filename": filename,
-                        "week": week,
-                        "session_type": session_type,
-                        "condition": condition_value,
-                        "speaker": speaker,
-                        "text": turn.get("text", ""),
-                        "extra_cue": cue
-                    }
-                    extra_example_data[week].append(example)
-
-        # Create entry for the nonverbal analysis table
-        entry = {
-            "Week": week,
-            "Filename": filename,
-            "Patient ID": patient_id,
-            "Session Type": session_type,
-            "Condition": condition_value,
-            "Caregiver Nonverbal": caregiver_nonverbal,
-            "PLWD Nonverbal": plwd_nonverbal,
-            "Total Nonverbal Cues": caregiver_nonverbal + plwd_nonverbal,
-            "Caregiver Turns": turn_word_data.get("caregiver_turns", 0),
-            "PLWD Turns": turn_word_data.get("plwd_turns", 0),
-            "Caregiver Words": turn_word_data.get("caregiver_words", 0),
-            "PLWD Words": turn_word_data.get("plwd_words", 0)
-        }
-        
-        # Add counts for specific nonverbal cue types (excluding extras)
-        for cue_type, count in nonverbal_cue_counts.items():
-            if cue_type.lower() not in EXTRA_CUES:
-                entry[f"{cue_type.replace('_', ' ').title()}"] = count
+        turn_word_data = enriched_index.get((patient_id, filename), {})
         
-        nonverbal_rows.append(entry)
+        file_metadata.append((filename, patient_id, week, session_type, condition_value))
         
-        # Create entry for the extra analysis table
-        extra_entry = {
+        # Turns are flattened into one cue table below; cues are classified and counted in bulk
+        file_turns.append({"filename": filename, "turns": file_data.get("turns", [])})
+
+        # Create entry shared by the nonverbal and extra analysis tables
+        file_rows.append({
             "Week": week,
             "Filename": filename,
             "Patient ID": patient_id,
             "Session Type": session_type,
             "Condition": condition_value,
-            "Caregiver Extra": caregiver_extra,
-            "PLWD Extra": plwd_extra,
-            "Total Extra Cues": caregiver_extra + plwd_extra,
             "Caregiver Turns": turn_word_data.get("caregiver_turns", 0),
             "PLWD Turns": turn_word_data.get("plwd_turns", 0),
             "Caregiver Words": turn_word_data.get("caregiver_words", 0),
             "PLWD Words": turn_word_data.get("plwd_words", 0)
-        }
+        })
         
-        # Add counts for specific extra cue types
-        for cue_type, count in nonverbal_cue_counts.items():
-            if cue_type.lower() in EXTRA_CUES:
-                extra_entry[f"{cue_type.replace('_', ' ').title()}"] = count
+        # Counts for specific cue types are joined on as columns after the loop
+        cue_type_counts[filename] = nonverbal_cue_counts
+
+    df_nonverbal = pd.DataFrame(file_rows)
+    df_extra = df_nonverbal.copy()  # New section for inaudible, pause, interruption
+
+    # One row per nonverbal cue of every turn, in file and turn order; missing turn
+    # fields get the old .get() defaults
+    turns_df = pd.json_normalize(file_turns, record_path="turns", max_level=0)
+    # The file of each turn is set by position, so a turn's own "filename" field cannot clash with it
+    turns_df["filename"] = np.repeat(
+        [ft["filename"] for ft in file_turns], [len(ft["turns"]) for ft in file_turns]
+    )
+    turns_df = turns_df.reindex(columns=["filename", "speaker", "text", "nonverbal_cues"])
+    turns_df = turns_df.fillna({"speaker": "unknown", "text": ""}).astype({"nonverbal_cues": object})
+    cues_df = turns_df.explode("nonverbal_cues").dropna(subset=["nonverbal_cues"])
+    cues_df = cues_df.rename(columns={"nonverbal_cues": "cue"})
+    
+    # Separate nonverbal cues from extra cues, lowercasing each distinct cue once
+    cue_codes, distinct_cues = pd.factorize(cues_df["cue"])
+    distinct_is_extra = np.array([cue.lower() in EXTRA_CUES for cue in distinct_cues], dtype=bool)
+    cues_df["is_extra"] = distinct_is_extra[cue_codes]
+    
+    if not df_nonverbal.empty:
+        # Count regular and extra cues per file by speaker in one groupby
+        cue_counts = cues_df.groupby(["filename", "speaker", "is_extra"]).size()
+        cue_counts = cue_counts.unstack(["speaker", "is_extra"], fill_value=0).reindex(
+            index=df_nonverbal["Filename"],
+            columns=pd.MultiIndex.from_product([["caregiver", "plwd"], [False, True]]),
+            fill_value=0
+        )
+        caregiver_nonverbal = cue_counts[("caregiver", False)].to_numpy()
+        plwd_nonverbal = cue_counts[("plwd", False)].to_numpy()
+        caregiver_extra = cue_counts[("caregiver", True)].to_numpy()
+        plwd_extra = cue_counts[("plwd", True)].to_numpy()
+        
+        df_nonverbal.insert(5, "Caregiver Nonverbal", caregiver_nonverbal)
+        df_nonverbal.insert(6, "PLWD Nonverbal", plwd_nonverbal)
+        df_nonverbal.insert(7, "Total Nonverbal Cues", caregiver_nonverbal + plwd_nonverbal)
+        df_extra.insert(5, "Caregiver Extra", caregiver_extra)
+        df_extra.insert(6, "PLWD Extra", plwd_extra)
+        df_extra.insert(7, "Total Extra Cues", caregiver_extra + plwd_extra)
+        
+        # One column per specific cue type, named like "Clears Throat"; extra cue types
+        # go to the extra table and the rest to the nonverbal table
+        cue_type_counts = pd.DataFrame.from_dict(cue_type_counts, orient="index")
+        cue_type_counts.columns = [cue_type.replace('_', ' ').title() for cue_type in cue_type_counts.columns]
+        if cue_type_counts.columns.has_duplicates:
+            # Cue types differing only in case or underscores share a column, the last one wins
+            cue_type_counts = cue_type_counts.T.groupby(level=0, sort=False).last().T
+        is_extra_type = np.array([column.lower() in EXTRA_CUES for column in cue_type_counts.columns], dtype=bool)
+        df_nonverbal = df_nonverbal.join(cue_type_counts.loc[:, ~is_extra_type], on="Filename")
+        df_extra = df_extra.join(cue_type_counts.loc[:, is_extra_type], on="Filename")
+    
+    # One example per regular or extra cue (is_extra tells them apart), with the metadata
+    # of its file (object dtype keeps the raw week values the examples are grouped by)
+    file_metadata = pd.DataFrame(
+        file_metadata, columns=["filename", "patient_id", "week", "session_type", "condition"], dtype=object
+    ).set_index("filename")
+    examples_df = cues_df.join(file_metadata, on="filename")
+
+    # --- Grouping by Week ---
+    if not df_nonverbal.empty:
+        # Both tables hold the same file rows, so the numeric week and the week label
+        # for display are computed once
+        week = pd.to_numeric(df_nonverbal['Week'], errors='coerce')
+        week_label = np.where(week.isna(), "Final", "Week " + week.fillna(0).astype(int).astype(str))
+        df_nonverbal['Week'] = week
+        df_nonverbal['Week Label'] = week_label
+        df_extra['Week'] = week
+        df_extra['Week Label'] = week_label
+        
+        # Categorical ID columns: cheaper to filter, group and sort than object strings
+        for col in ('Week Label', 'Patient ID', 'Session Type', 'Condition'):
+            df_nonverbal[col] = df_nonverbal[col].astype('category')
+            df_extra[col] = df_extra[col].astype('category')
         
-        extra_rows.append(extra_entry)
+        # Calculate rates for analysis
+        df_nonverbal['Caregiver Nonverbal Rate'] = word_rate(df_nonverbal['Caregiver Nonverbal'], df_nonverbal['Caregiver Words'])
+        df_nonverbal['PLWD Nonverbal Rate'] = word_rate(df_nonverbal['PLWD Nonverbal'], df_nonverbal['PLWD Words'])
+        df_nonverbal['Overall Nonverbal Rate'] = word_rate(df_nonverbal['Total Nonverbal Cues'],
+                                                           df_nonverbal['Caregiver Words'] + df_nonverbal['PLWD Words'])
+        
+        # Calculate rates for extra analysis
+        df_extra['Caregiver Extra Rate'] = word_rate(df_extra['Caregiver Extra'], df_extra['Caregiver Words'])
+        df_extra['PLWD Extra Rate'] = word_rate(df_extra['PLWD Extra'], df_extra['PLWD Words'])
+        df_extra['Overall Extra Rate'] = word_rate(df_extra['Total Extra Cues'],
+                                                   df_extra['Caregiver Words'] + df_extra['PLWD Words'])
+
+    return df_nonverbal, df_extra, examples_df
+
+@st.fragment
+def show_top_cues(overall_counts):
+    """Render the Top N slider and the bar chart of the most frequent nonverbal cues.
+    
+    Runs as a fragment, so moving the slider only reruns this chart.
+    """
+    # Add Top N selector
+    total_cues = len(overall_counts)
+    max_cues = min(20, total_cues)  # Cap at 20 for usability
+    default_n = min(10, total_cues)  # Default to 10 or fewer if less available
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        top_n = st.slider("Show Top N Cues", min_value=3, max_value=max_cues, value=default_n, step=1)
+    
+    # Filter to top N cues
+    filtered_counts = overall_counts.head(top_n)
+    
+    # Calculate dynamic y-axis range based on data
+    max_count = filtered_counts['Total Count'].max()
+    y_max = max_count * 1.1  # Add 10% padding
+    
+    # Create horizontal bar chart
+    with col1:
+        st.markdown(f"<h5>Showing top {top_n} of {total_cues} nonverbal cue types</h5>", unsafe_allow_html=True)
+    
+    fig_overall = px.bar(
+        filtered_counts, 
+        y='Nonverbal Cue Type', 
+        x='Total Count',
+        orientation='h',  # Horizontal orientation
+        title='Top Nonverbal Cues by Frequency',
+        labels={
+            'Total Count': 'Occurrences',
+            'Nonverbal Cue Type': 'Cue Type'
+        },
+        height=max(300, 40 * top_n)  # Dynamic height based on number of bars
+    )
+    
+    # Customize layout
+    fig_overall.update_layout(
+        xaxis_range=[0, y_max],
+        yaxis=dict(
+            categoryorder='total ascending'  # Order bars by value
+        ),
+        margin=dict(l=20, r=20, t=40, b=20),
+        hoverlabel=dict(bgcolor="white", font_size=12)
+    )
+    
+    # Add value labels on bars
+    fig_overall.update_traces(
+        texttemplate='%{x:,}',  # Format with commas
+        textposition='outside',
+        hovertemplate='<b>%{y}</b><br>Count: %{x:,}<extra></extra>'
+    )
+    
+    st.plotly_chart(fig_overall, use_container_width=True)
+
+@st.cache_data(show_spinner=False)
+def build_treemap_df(df_nonverbal, nonverbal_type_columns):
+    """Split each condition's cue type totals between the speakers for the treemap."""
+    # Cue type totals and speaker totals per condition, in order of first appearance
+    condition_groups = df_nonverbal.groupby('Condition', sort=False, observed=True)
+    cue_sums = condition_groups[nonverbal_type_columns].sum()
+    speaker_sums = condition_groups[['Caregiver Nonverbal', 'PLWD Nonverbal']].sum()
+    
+    # Each speaker gets their share of the condition's cues of every type, one row per
+    # condition, cue type and speaker; blocks with nothing to show are dropped
+    shares = speaker_sums.div(speaker_sums.sum(axis=1) + 0.0001, axis=0)
+    counts = cue_sums.to_numpy()[:, :, np.newaxis] * shares.to_numpy()[:, np.newaxis, :]
+    treemap_df = pd.DataFrame(
+        {'Count': counts.ravel()},
+        index=pd.MultiIndex.from_product(
+            [cue_sums.index, nonverbal_type_columns, ['Caregiver', 'PLWD']],
+            names=['Condition', 'Cue Type', 'Speaker']
+        )
+    ).reset_index()
+    treemap_df = treemap_df[treemap_df['Count'] > 0].astype({'Count': int})
+    treemap_df = treemap_df[['Condition', 'Speaker', 'Cue Type', 'Count']].reset_index(drop=True)
+    
+    # Create path for treemap hierarchy
+    treemap_df['path'] = treemap_df['Condition'].astype(str) + '/' + treemap_df['Speaker'] + '/' + treemap_df['Cue Type']
+    return treemap_df
 
-    df_nonverbal = pd.DataFrame(nonverbal_rows)
-    df_extra = pd.DataFrame(extra_rows)
+# --- Main Streamlit App for Non-verbal Analysis ---
+
+def main():
+    st.title("Nonverbal Communication Analysis")
+    
+    # Display data quality note
+    st.info("📊 **Data Quality Improvements**: Non-verbal cues have been cleaned and normalized. "
+            "Language annotations (e.g., 'speaking Portuguese'), technical metadata, and variations "
+            "like '[inaudible]' vs 'inaudible' have been standardized for consistent analysis.")
+
+    if not data_files_loaded():
+        st.warning("One or more required data files could not be loaded.")
+        return
+
+    # Filter options, without Final Interview files
+    _, all_patients, all_sessions, all_conditions = prepare_classified(CLASSIFIED_JSON_PATH)
+
+    # Filters - kept on the main page (not in sidebar)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_patients = st.multiselect("Select Participant(s)", options=all_patients, default=all_patients)
+    with col2:
+        selected_sessions = st.multiselect("Select Session Type(s)", options=all_sessions, default=all_sessions)
+    with col3:
+        selected_conditions = st.multiselect("Select Condition(s)", options=all_conditions, default=all_conditions)
+
+    df_nonverbal, df_extra, examples_df = build_tables(
+        tuple(selected_patients), tuple(selected_sessions), tuple(selected_conditions)
+    )
 
     if df_nonverbal.empty and df_extra.empty:
         st.info("No nonverbal communication or extra data available for selected filters.")
@@ -221,36 +371,6 @@ def main():
     selected_conditions_text = ", ".join(selected_conditions) if selected_conditions else "All"
     st.markdown(f"### Showing Nonverbal Communication Data for: Participants - **{selected_patients_text}**, Sessions - **{selected_sessions_text}**, Conditions - **{selected_conditions_text}**")
 
-    # --- Grouping by Week for Nonverbal Data ---
-    if not df_nonverbal.empty:
-        df_nonverbal['Week'] = pd.to_numeric(df_nonverbal['Week'], errors='coerce')
-        
-        # Create week label for display
-        df_nonverbal["Week Label"] = df_nonverbal["Week"].apply(
-            lambda w: "Final" if pd.isna(w) else f"Week {int(w)}" if not pd.isna(w) else "Unknown"
-        )
-        
-        # Calculate rates for analysis
-        df_nonverbal['Caregiver Nonverbal Rate'] = (df_nonverbal['Caregiver Nonverbal'] / df_nonverbal['Caregiver Words'] * 100).round(2)
-        df_nonverbal['PLWD Nonverbal Rate'] = (df_nonverbal['PLWD Nonverbal'] / df_nonverbal['PLWD Words'] * 100).round(2)
-        df_nonverbal['Overall Nonverbal Rate'] = ((df_nonverbal['Caregiver Nonverbal'] + df_nonverbal['PLWD Nonverbal']) / 
-                                                (df_nonverbal['Caregiver Words'] + df_nonverbal['PLWD Words']) * 100).round(2)
-    
-    # --- Grouping by Week for Extra Data ---
-    if not df_extra.empty:
-        df_extra['Week'] = pd.to_numeric(df_extra['Week'], errors='coerce')
-        
-        # Create week label for display
-        df_extra["Week Label"] = df_extra["Week"].apply(
-            lambda w: "Final" if pd.isna(w) else f"Week {int(w)}" if not pd.isna(w) else "Unknown"
-        )
-        
-        # Calculate rates for analysis
-        df_extra['Caregiver Extra Rate'] = (df_extra['Caregiver Extra'] / df_extra['Caregiver Words'] * 100).round(2)
-        df_extra['PLWD Extra Rate'] = (df_extra['PLWD Extra'] / df_extra['PLWD Words'] * 100).round(2)
-        df_extra['Overall Extra Rate'] = ((df_extra['Caregiver Extra'] + df_extra['PLWD Extra']) / 
-                                         (df_extra['Caregiver Words'] + df_extra['PLWD Words']) * 100).round(2)
-    
     # Display detailed table with filenames
     if not df_nonverbal.empty:
         st.subheader("Detailed Nonverbal Communication Data by File")
@@ -267,7 +387,10 @@ def main():
                                 and col not in ['Week']]
         
         # Sort by Week and Patient ID for better readability
-        df_sorted = df_nonverbal.sort_values(['Week', 'Patient ID']).fillna(0)
+        # (missing cue type counts become 0; the categorical columns are left as they are)
+        df_sorted = df_nonverbal.sort_values(['Week', 'Patient ID'])
+        numeric_columns = df_sorted.select_dtypes('number').columns
+        df_sorted[numeric_columns] = df_sorted[numeric_columns].fillna(0)
         
         # Format the table with styling
         st.dataframe(
@@ -304,7 +427,9 @@ def main():
                             and col not in ['Week']]
         
         # Sort by Week and Patient ID for better readability
-        df_extra_sorted = df_extra.sort_values(['Week', 'Patient ID']).fillna(0)
+        df_extra_sorted = df_extra.sort_values(['Week', 'Patient ID'])
+        numeric_columns = df_extra_sorted.select_dtypes('number').columns
+        df_extra_sorted[numeric_columns] = df_extra_sorted[numeric_columns].fillna(0)
         
         # Format the table with styling
         st.dataframe(
@@ -325,7 +450,7 @@ def main():
         st.subheader("Weekly Extra Communication Summary")
         
         # Group by week and calculate statistics
-        extra_summary_df = df_extra.groupby("Week Label").agg({
+        extra_summary_df = df_extra.groupby("Week Label", observed=True).agg({
             "Caregiver Extra": "sum",
             "PLWD Extra": "sum",
             "Caregiver Turns": "sum",
@@ -374,57 +499,7 @@ def main():
             # Sort by count in descending order
             overall_counts = overall_counts.sort_values('Total Count', ascending=False)
             
-            # Add Top N selector
-            total_cues = len(overall_counts)
-            max_cues = min(20, total_cues)  # Cap at 20 for usability
-            default_n = min(10, total_cues)  # Default to 10 or fewer if less available
-            
-            col1, col2 = st.columns([3, 1])
-            with col2:
-                top_n = st.slider("Show Top N Cues", min_value=3, max_value=max_cues, value=default_n, step=1)
-            
-            # Filter to top N cues
-            filtered_counts = overall_counts.head(top_n)
-            
-            # Calculate dynamic y-axis range based on data
-            max_count = filtered_counts['Total Count'].max()
-            y_max = max_count * 1.1  # Add 10% padding
-            
-            # Create horizontal bar chart
-            with col1:
-                st.markdown(f"<h5>Showing top {top_n} of {total_cues} nonverbal cue types</h5>", unsafe_allow_html=True)
-            
-            fig_overall = px.bar(
-                filtered_counts, 
-                y='Nonverbal Cue Type', 
-                x='Total Count',
-                orientation='h',  # Horizontal orientation
-                title='Top Nonverbal Cues by Frequency',
-                labels={
-                    'Total Count': 'Occurrences',
-                    'Nonverbal Cue Type': 'Cue Type'
-                },
-                height=max(300, 40 * top_n)  # Dynamic height based on number of bars
-            )
-            
-            # Customize layout
-            fig_overall.update_layout(
-                xaxis_range=[0, y_max],
-                yaxis=dict(
-                    categoryorder='total ascending'  # Order bars by value
-                ),
-                margin=dict(l=20, r=20, t=40, b=20),
-                hoverlabel=dict(bgcolor="white", font_size=12)
-            )
-            
-            # Add value labels on bars
-            fig_overall.update_traces(
-                texttemplate='%{x:,}',  # Format with commas
-                textposition='outside',
-                hovertemplate='<b>%{y}</b><br>Count: %{x:,}<extra></extra>'
-            )
-            
-            st.plotly_chart(fig_overall, use_container_width=True)
+            show_top_cues(overall_counts)
         else:
             st.info("No data available for nonverbal cues visualization.")
 
@@ -436,7 +511,7 @@ def main():
         st.subheader("Weekly Nonverbal Communication Summary")
         
         # Group by week and calculate statistics
-        summary_df = df_nonverbal.groupby("Week Label").agg({
+        summary_df = df_nonverbal.groupby("Week Label", observed=True).agg({
             "Caregiver Nonverbal": "sum",
             "PLWD Nonverbal": "sum",
             "Caregiver Turns": "sum",
@@ -533,47 +608,9 @@ def main():
     st.markdown("<p style='color:#666;font-size:0.9em;margin-bottom:1em'>Click on any block to zoom in and explore subcategories. Click in the center to zoom out.</p>", unsafe_allow_html=True)
     
     if not df_nonverbal.empty and 'Condition' in df_nonverbal.columns and nonverbal_type_columns:
-        # Create a list to hold all treemap data
-        treemap_data = []
-        
-        # Process data for each condition
-        for condition in df_nonverbal['Condition'].unique():
-            condition_data = df_nonverbal[df_nonverbal['Condition'] == condition]
-            
-            # Get caregiver nonverbal cues
-            for cue_type in nonverbal_type_columns:
-                caregiver_count = condition_data[cue_type].sum() * (condition_data['Caregiver Nonverbal'].sum() / 
-                                                                  (condition_data['Caregiver Nonverbal'].sum() + 
-                                                                   condition_data['PLWD Nonverbal'].sum() + 0.0001))
-                if caregiver_count > 0:
-                    treemap_data.append({
-                        'Condition': condition,
-                        'Speaker': 'Caregiver',
-                        'Cue Type': cue_type,
-                        'Count': int(caregiver_count)
-                    })
-                
-                # Get PLWD nonverbal cues
-                plwd_count = condition_data[cue_type].sum() * (condition_data['PLWD Nonverbal'].sum() / 
-                                                            (condition_data['Caregiver Nonverbal'].sum() + 
-                                                             condition_data['PLWD Nonverbal'].sum() + 0.0001))
-                if plwd_count > 0:
-                    treemap_data.append({
-                        'Condition': condition,
-                        'Speaker': 'PLWD',
-                        'Cue Type': cue_type,
-                        'Count': int(plwd_count)
-                    })
-        
-        # Create DataFrame from the collected data
-        treemap_df = pd.DataFrame(treemap_data)
+        treemap_df = build_treemap_df(df_nonverbal, nonverbal_type_columns)
         
         if not treemap_df.empty:
-            # Create path for treemap hierarchy
-            treemap_df['path'] = treemap_df.apply(
-                lambda x: f"{x['Condition']}/{x['Speaker']}/{x['Cue Type']}", axis=1
-            )
-            
             # Create the treemap
             fig_treemap = px.treemap(
                 treemap_df,
@@ -606,8 +643,12 @@ def main():
     # --- Example Section ---
     st.subheader("Communication Examples")
 
+    # Examples of each week, keyed by the raw week value; rows without a week
+    # are never listed, and dropping them keeps int weeks from becoming floats
+    examples_by_week = dict(iter(examples_df.groupby("week", sort=False)))
+    
     # Sort weeks for consistent display (handling text vs numeric weeks)
-    all_weeks = set(list(example_data.keys()) + list(extra_example_data.keys()))
+    all_weeks = set(examples_by_week)
     try:
         sorted_weeks = sorted([w for w in all_weeks if w is not None], 
                              key=lambda x: float(x) if x and x != 'Unknown' else float('inf'))
@@ -619,8 +660,9 @@ def main():
     
     # Display examples by week
     for week in sorted_weeks:
-        nonverbal_examples = example_data.get(week, [])
-        extra_examples = extra_example_data.get(week, [])
+        week_examples = examples_by_week[week]
+        nonverbal_examples = week_examples[~week_examples["is_extra"]]
+        extra_examples = week_examples[week_examples["is_extra"]]
         week_label = "Final" if week is None or pd.isna(week) else f"Week {week}"
         
         total_examples = len(nonverbal_examples) + len(extra_examples)
@@ -629,28 +671,28 @@ def main():
             with st.expander(f"{week_label} Examples ({total_examples} total: {len(nonverbal_examples)} nonverbal, {len(extra_examples)} extra)"):
                 
                 # Display nonverbal examples
-                if nonverbal_examples:
+                if not nonverbal_examples.empty:
                     st.markdown("**Nonverbal Communication Examples:**")
-                    for idx, example in enumerate(nonverbal_examples[:15]):  # Limit to 15 per type
-                        speaker_bold = "**Caregiver**" if example['speaker'] == 'caregiver' else "**PLWD**"
-                        nonverbal_highlighted = f"{example['text']} **[{example['nonverbal_cue']}]**"
+                    for idx, example in enumerate(nonverbal_examples.head(15).itertuples(index=False)):  # Limit to 15 per type
+                        speaker_bold = "**Caregiver**" if example.speaker == 'caregiver' else "**PLWD**"
+                        nonverbal_highlighted = f"{example.text} **[{example.cue}]**"
                         
                         st.markdown(f"{idx+1}. {speaker_bold}: {nonverbal_highlighted}")
-                        st.markdown(f"   - Session: {example['session_type']}, Condition: {example['condition']}")
+                        st.markdown(f"   - Session: {example.session_type}, Condition: {example.condition}")
                         st.divider()
                     
                     if len(nonverbal_examples) > 15:
                         st.info(f"{len(nonverbal_examples) - 15} more nonverbal examples not shown")
                 
                 # Display extra examples
-                if extra_examples:
+                if not extra_examples.empty:
                     st.markdown("**Extra Communication Elements Examples:**")
-                    for idx, example in enumerate(extra_examples[:15]):  # Limit to 15 per type
-                        speaker_bold = "**Caregiver**" if example['speaker'] == 'caregiver' else "**PLWD**"
-                        extra_highlighted = f"{example['text']} **[{example['extra_cue']}]**"
+                    for idx, example in enumerate(extra_examples.head(15).itertuples(index=False)):  # Limit to 15 per type
+                        speaker_bold = "**Caregiver**" if example.speaker == 'caregiver' else "**PLWD**"
+                        extra_highlighted = f"{example.text} **[{example.cue}]**"
                         
                         st.markdown(f"{idx+1}. {speaker_bold}: {extra_highlighted}")
-                        st.markdown(f"   - Session: {example['session_type']}, Condition: {example['condition']}")
+                        st.markdown(f"   - Session: {example.session_type}, Condition: {example.condition}")
                         st.divider()
                     
                     if len(extra_examples) > 15:
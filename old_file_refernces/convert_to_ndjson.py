@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import ijson
+import orjson
+
+def convert_to_ndjson(source_path="enhanced_transcript_analysis.json", output_path="enhanced_turns.ndjson"):
+    """
+    One-off conversion of enhanced_transcript_analysis.json into NDJSON with one turn per line.
+    Each line holds the filename, speaker and is_question fields the lexical diversity page
+    reads, so the page can load the turns as a flat table instead of walking the nested JSON.
+    """
+    print(f"Converting {source_path} to {output_path}...")
+
+    files_converted = 0
+    turns_written = 0
+    with open(source_path, "rb") as source, open(output_path, "wb") as output:
+        for filename, file_data in ijson.kvitems(source, "by_file", use_float=True):
+            for turn in file_data.get("turns", []):
+                output.write(orjson.dumps({
+                    "filename": filename,
+                    "speaker": turn.get("speaker", ""),
+                    "is_question": bool(turn.get("is_question", False)),
+                }))
+                output.write(b"\n")
+                turns_written += 1
+            files_converted += 1
+
+    print(f"Converted {files_converted} files and {turns_written} turns")
+    print(f"Re-run this script whenever {source_path} changes; older NDJSON is ignored by the app")
+
+if __name__ == "__main__":
+    convert_to_ndjson()